@@ -1,4 +1,22 @@
-import importlib.metadata
+from typing import Any
 
 PACKAGE = "subclean"
-__version__ = importlib.metadata.version(PACKAGE)
+
+__all__ = ["Cleaner", "clean_subtitle", "clean_text"]
+
+
+def __getattr__(name: str) -> Any:
+    # resolved on first access, so the CLI doesn't pay for importlib.metadata
+    # and the processors on every start
+    if name == "__version__":
+        import importlib.metadata
+
+        value = importlib.metadata.version(PACKAGE)
+    elif name in __all__:
+        from subclean import api
+
+        value = getattr(api, name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
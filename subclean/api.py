@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from argparse import Namespace
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from pathlib import Path
+from typing import Any, Union
+
+from subclean.cli import build_parser
+from subclean.config import CleanConfig
+from subclean.core.subtitle import Subtitle, SubtitleFormat
+from subclean.processors.pipeline import Pipeline
+from subclean.processors.processor import (
+    DEFAULT_PROCESSORS,
+    BlacklistProcessor,
+    Processor,
+    Processors,
+)
+from subclean.subclean import retime_sections
+
+ProcessorsArg = Sequence[Union[Processors, type[Processor]]]
+
+
+def resolve_processors(processors: ProcessorsArg) -> list[type[Processor]]:
+    return [p.value if isinstance(p, Processors) else p for p in processors]
+
+
+def resolve_options(
+    options: Mapping[str, Any] | Namespace | None, defaults: Namespace | None = None
+) -> Namespace:
+    """Fill in CLI defaults for options not given, e.g. {"line_length": 42}."""
+    args = defaults if defaults is not None else build_parser().parse_args([])
+    if options is None:
+        return args
+    if isinstance(options, Namespace):
+        options = vars(options)
+    unknown = set(options) - set(vars(args))
+    if unknown:
+        raise TypeError(f"Unknown options: {', '.join(sorted(unknown))}")
+    return Namespace(**{**vars(args), **options})
+
+
+class Cleaner:
+    """Clean subtitles with a fixed chain of processors and options.
+
+    Options are resolved, rule files loaded and the blacklist built once, when
+    the cleaner is created. Every call runs a pipeline of its own that shares
+    only these read-only parts, so one cleaner can be used from many threads."""
+
+    def __init__(
+        self,
+        processors: ProcessorsArg = DEFAULT_PROCESSORS,
+        options: Mapping[str, Any] | Namespace | CleanConfig | None = None,
+    ) -> None:
+        self.processors: list[type[Processor]] = resolve_processors(processors)
+        self.config: CleanConfig = (
+            options
+            if isinstance(options, CleanConfig)
+            else CleanConfig.from_args(resolve_options(options))
+        )
+        self.kwargs: dict[str, Any] = {"config": self.config}
+        if BlacklistProcessor in self.processors:
+            self.kwargs["matcher"] = BlacklistProcessor.build_matcher(self.config)
+
+    def clean(self, subtitle: Subtitle) -> Subtitle:
+        """Clean a loaded subtitle in place and return it."""
+        Pipeline(subtitle, self.processors, **self.kwargs).process()
+        subtitle.sections = list(retime_sections(subtitle.sections, self.config))
+        return subtitle
+
+    def clean_many(self, subtitles: Iterable[Subtitle]) -> Iterator[Subtitle]:
+        """Clean subtitles one at a time as they are consumed."""
+        for subtitle in subtitles:
+            yield self.clean(subtitle)
+
+    def clean_text(
+        self, text: str | bytes, format: SubtitleFormat | None = None
+    ) -> str:
+        if format is None:
+            # recognized from the content, or SubRip
+            format = SubtitleFormat.detect(Path("subtitle.srt"), text)
+        subtitle: Subtitle = format.handler.from_string(
+            text, Path(f"subtitle{format.ext}")
+        )
+        return self.clean(subtitle).dumps()
+
+
+def clean_subtitle(
+    subtitle: Subtitle,
+    processors: ProcessorsArg = DEFAULT_PROCESSORS,
+    options: Mapping[str, Any] | Namespace | CleanConfig | None = None,
+) -> Subtitle:
+    return Cleaner(processors, options).clean(subtitle)
+
+
+def clean_text(
+    text: str | bytes,
+    processors: ProcessorsArg = DEFAULT_PROCESSORS,
+    options: Mapping[str, Any] | Namespace | CleanConfig | None = None,
+    format: SubtitleFormat | None = None,
+) -> str:
+    """Clean subtitle text, or raw bytes in any supported encoding,
+    and return the cleaned subtitle without touching the disk.
+    The format is recognized from the content unless given."""
+    return Cleaner(processors, options).clean_text(text, format)
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+from argparse import Namespace
+from collections.abc import AsyncGenerator, Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from loguru import logger
+
+from subclean.core.parser import SubtitleParser
+from subclean.core.result import CleanResult
+from subclean.core.subtitle import SubtitleFormat, atomic_open
+from subclean.manifest import Manifest
+from subclean.processors.processor import Processor
+from subclean.stats import StatsReport
+from subclean.subclean import (
+    clean,
+    keep_encoding,
+    piped,
+    print_diff,
+    setup_logger,
+    subclean,
+)
+
+
+def init_worker(level: str, stderr: bool) -> None:
+    """Log from a worker process to the same stream as the main process,
+    which can't be sent to the worker itself."""
+    setup_logger(level, sys.stderr if stderr else sys.stdout)
+
+
+def find_subtitles(root: Path) -> Iterator[Path]:
+    """Recursively find subtitle files below root, skipping our own output files."""
+    extensions = SubtitleFormat.values()
+    for path in sorted(root.rglob("*")):
+        if (
+            path.suffix in extensions
+            and not path.stem.endswith("_clean")
+            and path.is_file()
+        ):
+            yield path
+
+
+def clean_file(
+    path: Path, processors: list[type[Processor]], args: Namespace
+) -> CleanResult:
+    """Clean a single file, turning any exception into a failed result."""
+    start = time.perf_counter()
+    try:
+        return subclean(path, processors, args)
+    except Exception as e:
+        return failure(path, e, start)
+
+
+def failure(path: Path, e: Exception, start: float) -> CleanResult:
+    logger.opt(exception=e).debug("Failed to clean subtitle {}", path)
+    return CleanResult(
+        path, duration=time.perf_counter() - start, error=f"{type(e).__name__}: {e}"
+    )
+
+
+def clean_data(
+    path: Path, data: bytes, processors: list[type[Processor]], args: Namespace
+) -> tuple[bytes, Path, CleanResult]:
+    """The CPU bound part of cleaning a file that has already been read,
+    returning the encoded output and the path to write it to."""
+    subtitle = SubtitleParser.load(path, data=data)
+    result = clean(subtitle, processors, args)
+    output = path if args.overwrite else args.output
+    result.output = subtitle.output_path(Path(output) if output else None)
+    return (
+        subtitle.encode(subtitle.dumps(), keep_encoding(args)),
+        result.output,
+        result,
+    )
+
+
+def write_bytes(path: Path, data: bytes) -> None:
+    logger.info("Saving subtitle {}", path)
+    with atomic_open(path, "wb") as out_f:
+        out_f.write(data)
+
+
+async def clean_async(
+    paths: Iterable[Path],
+    processors: list[type[Processor]],
+    args: Namespace,
+    executor: Executor | None = None,
+    in_flight: int = 16,
+) -> AsyncGenerator[CleanResult, None]:
+    """Read and write files in threads while cleaning others on the executor,
+    with at most in_flight files read but not yet written at any time."""
+    loop = asyncio.get_running_loop()
+
+    async def clean_one(path: Path) -> CleanResult:
+        start = time.perf_counter()
+        try:
+            data = await asyncio.to_thread(path.read_bytes)
+            output_data, output, result = await loop.run_in_executor(
+                executor, clean_data, path, data, processors, args
+            )
+            if not getattr(args, "dry_run", False):
+                await asyncio.to_thread(write_bytes, output, output_data)
+        except Exception as e:
+            return failure(path, e, start)
+        result.duration = time.perf_counter() - start
+        return result
+
+    pending: set[asyncio.Future[CleanResult]] = set()
+    for path in paths:
+        if len(pending) >= in_flight:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for future in done:
+                yield future.result()
+        pending.add(asyncio.ensure_future(clean_one(path)))
+    for future in asyncio.as_completed(pending):
+        yield await future
+
+
+def dispatch_async(
+    paths: Iterable[Path],
+    processors: list[type[Processor]],
+    args: Namespace,
+    jobs: int = 1,
+    in_flight: int = 16,
+) -> Iterator[CleanResult]:
+    """Run clean_async on its own event loop, yielding results as they complete.
+    CPU work goes to a pool of jobs worker processes, or a thread for jobs=1."""
+    executor: Executor | None = None
+    if jobs > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=init_worker,
+            initargs=(args.log_level, piped(args)),
+        )
+    loop = asyncio.new_event_loop()
+    results = clean_async(paths, processors, args, executor, in_flight)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(results.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(results.aclose())
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
+        if executor is not None:
+            executor.shutdown()
+
+
+def dispatch(
+    paths: Iterable[Path],
+    processors: list[type[Processor]],
+    args: Namespace,
+    jobs: int = 1,
+) -> Iterator[CleanResult]:
+    """Clean files on a pool of worker processes,
+    yielding results in order of completion."""
+    # open file handles from argparse can't be sent to worker processes
+    worker_args = Namespace(**{**vars(args), "file": None})
+    if getattr(args, "async_io", False):
+        yield from dispatch_async(paths, processors, worker_args, jobs, args.in_flight)
+        return
+    if jobs <= 1:
+        for path in paths:
+            yield clean_file(path, processors, worker_args)
+        return
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=init_worker,
+        initargs=(args.log_level, piped(args)),
+    ) as executor:
+        futures = [
+            executor.submit(clean_file, path, processors, worker_args) for path in paths
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def clean_files(
+    paths: Iterable[Path],
+    processors: list[type[Processor]],
+    args: Namespace,
+    jobs: int = 1,
+    manifest: Manifest | None = None,
+) -> Iterator[CleanResult]:
+    """Clean files, skipping those that are current in the manifest
+    and recording the others once they're done."""
+    if manifest is None or getattr(args, "dry_run", False):
+        yield from dispatch(paths, processors, args, jobs)
+        return
+    fingerprint = manifest.fingerprint(processors, args)
+    changed: list[Path] = []
+    for path in paths:
+        if manifest.is_current(path, fingerprint):
+            yield CleanResult(path, skipped=True)
+        else:
+            changed.append(path)
+    for result in dispatch(changed, processors, args, jobs):
+        manifest.record(result, fingerprint)
+        yield result
+
+
+def run(
+    paths: Iterable[Path],
+    processors: list[type[Processor]],
+    args: Namespace,
+    manifest: Manifest | None = None,
+    report: StatsReport | None = None,
+) -> int:
+    """Clean all files and log a summary per file. Returns the number of failures."""
+    start = time.perf_counter()
+    total = skipped = failed = removed = 0
+    for result in clean_files(paths, processors, args, args.jobs, manifest):
+        total += 1
+        removed += result.lines_removed
+        print_diff(result)
+        if report is not None:
+            report.add(result)
+        if not result.ok:
+            failed += 1
+            logger.error("{}", result)
+        elif result.skipped:
+            skipped += 1
+            logger.debug("{}", result)
+        else:
+            logger.info("{}", result)
+    logger.info(
+        "Cleaned {} of {} files ({} skipped, {} failed, {} lines removed) in {:.2f}s",
+        total - skipped - failed,
+        total,
+        skipped,
+        failed,
+        removed,
+        time.perf_counter() - start,
+    )
+    return failed
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from subclean.core.parser import SubtitleParser
+from subclean.core.subtitle import Subtitle
+from subclean.processors.pipeline import Pipeline
+from subclean.processors.processor import (
+    DEFAULT_PROCESSORS,
+    Processor,
+    Processors,
+)
+
+DIALOG = [
+    "I got some time between 4:00 and 6:00.",
+    "What if she's supposed to be with me?",
+    "All right, let's pick up the pace.",
+    "Madame... ...for you, I'll make it",
+    "on my part, I mean,  utter idiocy. ",
+    "First sentence.Second sentence.",
+    "You don&apos;t know what you&apos;re talking about.",
+    "Go on now.",
+    "What you got?",
+]
+SDH = [
+    "[camera shutter]",
+    "(distant shouting)",
+    "♪ ominous music playing ♪",
+    "- TAMIKA: Yeah.",
+    "that's for you. [sighs]",
+    "‐TEACHER: blabla...",
+    "<i>[Laura]</i> <i>sentence</i>",
+]
+ADS = [
+    "Advertise your product or brand here",
+    "contact www.OpenSubtitles.org today",
+    "Subtitles by username",
+    "Please rate this subtitle at www.osdb.link/123xyz",
+]
+
+
+def timestamp(ms: int) -> str:
+    return f"{ms // 3_600_000:02}:{ms // 60_000 % 60:02}:{ms // 1000 % 60:02},{ms % 1000:03}"
+
+
+def generate_corpus(sections: int, seed: int = 0) -> str:
+    """Synthetic SRT with a realistic mix of dialog, SDH, style tags and ads."""
+    rng = random.Random(seed)
+    out: list[str] = []
+    start = 1000
+    for index in range(1, sections + 1):
+        end = start + rng.randint(800, 4000)
+        kind = rng.random()
+        if kind < 0.02:
+            lines = [rng.choice(ADS)]
+        elif kind < 0.25:
+            lines = [rng.choice(SDH), rng.choice(DIALOG)]
+        elif kind < 0.45:
+            lines = [f"-{rng.choice(DIALOG)}", f"- {rng.choice(DIALOG)}"]
+        elif kind < 0.6:
+            lines = [f"<i>{rng.choice(DIALOG)}</i>"]
+        else:
+            lines = rng.sample(DIALOG, rng.randint(1, 2))
+        out.append(f"{index}\n{timestamp(start)} --> {timestamp(end)}\n")
+        out.append("\n".join(lines) + "\n\n")
+        start = end + rng.randint(0, 2000)
+    return "".join(out)
+
+
+@dataclass
+class Measurement:
+    name: str
+    sections: int
+    seconds: float
+    peak_memory: int
+
+    @property
+    def throughput(self) -> float:
+        return self.sections / self.seconds if self.seconds else float("inf")
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name:<24} {self.sections:>9} {self.seconds:>9.4f}s"
+            f" {self.throughput:>12,.0f}/s {self.peak_memory / 2**20:>9.2f} MiB"
+        )
+
+
+def measure(
+    name: str,
+    sections: int,
+    setup: Callable[[], Any],
+    run: Callable[[Any], object],
+    repeat: int,
+) -> Measurement:
+    """Best wall time over repeated runs, peak memory from one traced run."""
+    best = float("inf")
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        best = min(best, time.perf_counter() - start)
+    state = setup()
+    tracemalloc.start()
+    try:
+        run(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Measurement(name, sections, best, peak)
+
+
+def run_processor(processor: type[Processor]) -> Callable[[Subtitle], Subtitle]:
+    return lambda subtitle: processor(subtitle).process()
+
+
+def bench(sizes: list[int], repeat: int = 3) -> list[Measurement]:
+    processors = [processor.value for processor in DEFAULT_PROCESSORS]
+    results: list[Measurement] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = Path(tmp) / f"bench_{size}.srt"
+            path.write_text(generate_corpus(size), encoding="utf-8")
+            output = path.with_stem(path.stem + "_clean")
+
+            def load() -> Subtitle:
+                return SubtitleParser.load(path)
+
+            results.append(
+                measure(
+                    "SubtitleParser.load", size, lambda: None, lambda _: load(), repeat
+                )
+            )
+            for processor in Processors:
+                results.append(
+                    measure(
+                        processor.value.__name__,
+                        size,
+                        load,
+                        run_processor(processor.value),
+                        repeat,
+                    )
+                )
+            results.append(
+                measure(
+                    "Pipeline",
+                    size,
+                    load,
+                    lambda s: Pipeline(s, processors).process(),
+                    repeat,
+                )
+            )
+            results.append(
+                measure(
+                    "SrtSubtitle.save",
+                    size,
+                    load,
+                    lambda s: s.save(output),
+                    repeat,
+                )
+            )
+    return results
+
+
+# what the console script runs
+ENTRY_POINT = "import sys; from subclean.subclean import main; main(sys.argv[1:])"
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, check=True
+    )
+
+
+def startup(path: Path, repeat: int = 3) -> dict[str, float]:
+    """Best wall time of cold starts in a fresh interpreter, in seconds."""
+    commands = {
+        "python": ["-c", "pass"],
+        "import subclean": ["-c", "import subclean"],
+        "subclean --version": ["-c", ENTRY_POINT, "--version"],
+        "subclean FILE": ["-c", ENTRY_POINT, str(path)],
+    }
+    results: dict[str, float] = {}
+    for name, command in commands.items():
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run_python(*command)
+            best = min(best, time.perf_counter() - start)
+        results[name] = best
+    return results
+
+
+def slowest_imports(*args: str, count: int = 10) -> list[tuple[str, int]]:
+    """Modules with the highest cumulative import time (µs) from -X importtime."""
+    stderr = run_python("-X", "importtime", "-c", ENTRY_POINT, *args).stderr
+    imports: list[tuple[str, int]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        imports.append((module.strip(), int(cumulative)))
+    return sorted(imports, key=lambda i: i[1], reverse=True)[:count]
+
+
+def print_startup(repeat: int, as_json: bool) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "startup.srt"
+        path.write_text(generate_corpus(100), encoding="utf-8")
+        results = startup(path, repeat)
+        imports = slowest_imports(str(path))
+    if as_json:
+        print(json.dumps({"startup": results, "imports": dict(imports)}, indent=2))
+        return
+    for name, seconds in results.items():
+        print(f"{name:<24} {seconds * 1000:>9.1f}ms")
+    print("\nslowest imports (subclean FILE)")
+    for module, us in imports:
+        print(f"{module:<40} {us / 1000:>9.1f}ms")
+
+
+def parse_args(args: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="subclean bench", description="Benchmark parsing and processors"
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=[1000, 10000],
+        help="Number of sections of the generated subtitles (default: 1000 10000)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per measurement (default: 3)"
+    )
+    parser.add_argument(
+        "--startup",
+        action="store_true",
+        help="Measure interpreter cold start and import time instead",
+    )
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    return parser.parse_args(args)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    logger.remove()
+    if args.startup:
+        return print_startup(args.repeat, args.json)
+    results = bench(args.sizes, args.repeat)
+    if args.json:
+        print(
+            json.dumps(
+                [{**asdict(r), "throughput": r.throughput} for r in results], indent=2
+            )
+        )
+        return
+    print(
+        f"{'benchmark':<24} {'sections':>9} {'time':>10} {'throughput':>14} {'peak':>13}"
+    )
+    for result in results:
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,44 @@
 from __future__ import annotations
 
 import argparse
+import re
+from pathlib import Path
 
-from subclean.processors.processor import DEFAULT_PROCESSORS, Processors
 
-from . import __version__
+class VersionAction(argparse.Action):
+    """Like the "version" action, but looks up the installed version only when used."""
 
+    def __init__(self, option_strings: list[str], dest: str, **kwargs) -> None:
+        super().__init__(
+            option_strings,
+            dest=argparse.SUPPRESS,
+            default=argparse.SUPPRESS,
+            nargs=0,
+            help="show program's version number and exit",
+        )
+
+    def __call__(self, parser, namespace, values, option_string=None) -> None:
+        from subclean import __version__
+
+        print(f"{parser.prog} {__version__}")
+        parser.exit()
+
+
+def handle_version(args: list[str]) -> None:
+    """Print the version and exit if asked to, before build_parser() imports
+    the processors for the list of choices."""
+    parser = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
+    parser.add_argument("-V", "--version", action=VersionAction)
+    parser.parse_known_args(args)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    from subclean.processors.processor import DEFAULT_PROCESSORS, Processors
 
-def parse_args(args: list[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Clean Subtitles")
     parser.add_argument(
         "file",
-        nargs="+",
+        nargs="*",
         metavar="FILE",
         type=argparse.FileType("r"),
         help="Subtitle file to be processed",
@@ -28,12 +55,16 @@ def parse_args(args: list[str] | None = None) -> argparse.Namespace:
     parser.add_argument(
         "-V",
         "--version",
-        action="version",
-        version="%(prog)s " + __version__,
+        action=VersionAction,
     )
     group = parser.add_mutually_exclusive_group()
     group.add_argument("-o", "--output", type=str, help="Set output filename")
     group.add_argument("--overwrite", action="store_true", help="Overwrite input file")
+    parser.add_argument(
+        "--keep-encoding",
+        action="store_true",
+        help="Save in the encoding of the input instead of UTF-8",
+    )
     parser.add_argument(
         "--processors",
         nargs="+",
@@ -43,11 +74,145 @@ def parse_args(args: list[str] | None = None) -> argparse.Namespace:
         default=DEFAULT_PROCESSORS,
     )
     parser.add_argument(
-        "--regex", type=str, help="Add custom regular expression to BlacklistProcessor"
+        "--regex",
+        type=str,
+        action="append",
+        help="Add custom regular expression to BlacklistProcessor, may be repeated",
+    )
+    parser.add_argument(
+        "--rules",
+        metavar="PATH",
+        type=Path,
+        action="append",
+        help="Add blacklist rules from a text (one regular expression per line), TOML or YAML file, may be repeated",
     )
     parser.add_argument(
         "--line-length",
         type=int,
         help="Maximum total line length when concatenating short lines. (default: 50)",
     )
-    return parser.parse_args(args)
+    parser.add_argument(
+        "--min-duration",
+        metavar="MS",
+        type=int,
+        help="Minimum section duration for TimingProcessor. (default: 800)",
+    )
+    parser.add_argument(
+        "--min-gap",
+        metavar="MS",
+        type=int,
+        help="Minimum gap between sections for TimingProcessor. (default: 80)",
+    )
+    parser.add_argument(
+        "--shift",
+        metavar="MS",
+        type=int,
+        help="Shift all timings by milliseconds (may be negative)",
+    )
+    parser.add_argument(
+        "--fps",
+        nargs=2,
+        metavar=("FROM", "TO"),
+        type=float,
+        help="Convert timings from one framerate to another, e.g. 23.976 25",
+    )
+    parser.add_argument(
+        "-r",
+        "--recursive",
+        metavar="DIR",
+        type=Path,
+        action="append",
+        default=[],
+        help="Clean all subtitle files in directory tree",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of files to clean in parallel (default: 1)",
+    )
+    parser.add_argument(
+        "--async",
+        dest="async_io",
+        action="store_true",
+        help="Read and write files concurrently while cleaning, for files on slow or network storage",
+    )
+    parser.add_argument(
+        "--in-flight",
+        metavar="N",
+        type=int,
+        default=16,
+        help="Maximum number of files being read, cleaned or written at once with --async (default: 16)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Process sections while reading, keeping memory use constant for large files",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Don't write any output, log how many lines each processor would change",
+    )
+    parser.add_argument(
+        "--diff",
+        action="store_true",
+        help="Print a unified diff of the changed sections, e.g. with --dry-run",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Log time and line counts per processor",
+    )
+    parser.add_argument(
+        "--stats-json",
+        metavar="PATH",
+        help="Write processor statistics as JSON to PATH ('-' for stdout, logging to stderr)",
+    )
+    parser.add_argument(
+        "--manifest",
+        metavar="PATH",
+        type=Path,
+        help="Skip files that haven't changed since they were recorded in this manifest",
+    )
+    return parser
+
+
+def parse_args(args: list[str] | None = None) -> argparse.Namespace:
+    parser = build_parser()
+    namespace = parser.parse_args(args)
+    if not namespace.file and not namespace.recursive:
+        parser.error("at least one FILE or --recursive DIR is required")
+    if namespace.output and (namespace.recursive or len(namespace.file) > 1):
+        parser.error("--output can only be used with a single FILE")
+    if namespace.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if namespace.in_flight < 1:
+        parser.error("--in-flight must be at least 1")
+    if namespace.stream and (namespace.dry_run or namespace.diff):
+        parser.error("--dry-run and --diff can't be used with --stream")
+    if namespace.stream and namespace.async_io:
+        # --async holds each file in memory while it's cleaned
+        parser.error("--async can't be used with --stream")
+    validate_rules(parser, namespace)
+    return namespace
+
+
+def validate_rules(
+    parser: argparse.ArgumentParser, namespace: argparse.Namespace
+) -> None:
+    """Fail early on broken rules instead of once per file."""
+    for pattern in namespace.regex or []:
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            parser.error(f"invalid --regex {pattern!r}: {e}")
+    if namespace.rules:
+        from subclean.rules import RuleError, load_rules
+
+        for path in namespace.rules:
+            try:
+                load_rules(path)
+            except RuleError as e:
+                parser.error(str(e))
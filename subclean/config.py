@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from argparse import Namespace
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass(frozen=True)
+class CleanConfig:
+    """Options of a cleaning run that processors read their settings from.
+
+    A config is immutable and processors never write to shared state, so the
+    same config can be used by any number of runs at once, e.g. in threads
+    or by a worker handling many jobs. Unset options use processor defaults."""
+
+    regex: tuple[str, ...] = ()
+    rules: tuple[Path, ...] = ()
+    line_length: int | None = None
+    min_duration: int | None = None
+    min_gap: int | None = None
+    shift: int = 0
+    fps: tuple[float, float] | None = None
+
+    @classmethod
+    def from_args(cls, args: Namespace | CleanConfig | None) -> CleanConfig:
+        """Config from parsed command line arguments, which may be missing
+        options that don't apply, e.g. a Namespace built by hand."""
+        if isinstance(args, CleanConfig):
+            return args
+        if args is None:
+            return cls()
+        regex: str | list[str] | None = getattr(args, "regex", None)
+        fps = getattr(args, "fps", None)
+        return cls(
+            regex=(regex,) if isinstance(regex, str) else tuple(regex or ()),
+            rules=tuple(Path(path) for path in getattr(args, "rules", None) or ()),
+            line_length=getattr(args, "line_length", None),
+            min_duration=getattr(args, "min_duration", None),
+            min_gap=getattr(args, "min_gap", None),
+            shift=getattr(args, "shift", None) or 0,
+            fps=(fps[0], fps[1]) if fps is not None else None,
+        )
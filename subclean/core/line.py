@@ -3,24 +3,51 @@ from __future__ import annotations
 import re
 from collections.abc import Sequence
 
+STYLE_TAG = re.compile(r"<[^>]*>")
+STYLE_BRACES = re.compile(r"{[^}]*}")
+OUTER_WHITESPACE = re.compile(r"^(<\/?i>)*\s+|\s+(<\/?i>)*$")
+DIALOG = re.compile(r"^(<\/?i>)*[-]")
+
 
 class Line(str):
+    """A line of subtitle text.
+
+    Lines are immutable, so the text without style tags is computed once
+    on first use and cached. Substitutions that don't change anything return
+    the same line, keeping its cache."""
+
+    __slots__ = ("_visible",)
+
+    @property
+    def visible(self) -> str:
+        """Text without style tags."""
+        try:
+            return self._visible
+        except AttributeError:
+            self._visible: str = STYLE_BRACES.sub("", STYLE_TAG.sub("", self))
+            return self._visible
+
     def __len__(self) -> int:
-        return len(str(self.strip_styles()))
+        return len(self.visible)
 
     def strip_styles(self) -> Line:
-        return self.sub(r"<[^>]*>", "").sub(r"{[^}]*}", "")
+        return Line(self.visible)
 
     def sub(self, regex: str | re.Pattern[str], replacement: str) -> Line:
-        return Line(re.sub(regex, replacement, self))
+        result, n = re.subn(regex, replacement, self)
+        if not n or result == self:
+            return self
+        return Line(result)
 
     def strip(self, *_) -> Line:
         """Remove leading and trailing whitespace
         also between style tags"""
-        return self.sub(r"^(<\/?i>)*\s+|\s+(<\/?i>)*$", r"\1\2")
+        return self.sub(OUTER_WHITESPACE, r"\1\2")
 
     def is_dialog(self) -> bool:
-        return bool(re.search(r"^(<\/?i>)*[-]", self))
+        if self.startswith("-"):
+            return True
+        return self.startswith("<") and DIALOG.match(self) is not None
 
     @staticmethod
     def merge(lines: Sequence[Line]) -> Line:
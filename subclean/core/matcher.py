@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import re
+import sys
+from collections import deque
+from collections.abc import Iterable, Mapping
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from subclean.rules import RulePack
+
+if sys.version_info >= (3, 11):
+    from re import _parser as sre_parse  # type: ignore[attr-defined]
+else:
+    import sre_parse
+
+# casefold() maps every character to the same string as the characters the re
+# module considers equal ignoring case, except for the Turkish i variants.
+# Folding lines and literals this way makes the literal scan find a superset
+# of what the case-insensitive rules can match.
+CASE_FOLD = str.maketrans({"\u0130": "i", "\u0131": "i"})
+
+REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT}
+if sys.version_info >= (3, 11):
+    REPEATS.add(sre_parse.POSSESSIVE_REPEAT)
+
+
+def fold(text: str) -> str:
+    return text.translate(CASE_FOLD).casefold()
+
+
+def required_literals(pattern: str) -> frozenset[str] | None:
+    """Literals of which at least one occurs in every string the pattern matches,
+    or None if the pattern doesn't require any, e.g. r"^[-_]+$"."""
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return None
+    literals = _required(parsed)
+    return frozenset(fold(literal) for literal in literals) if literals else None
+
+
+def _required(items: Iterable[tuple[Any, Any]]) -> set[str] | None:
+    candidates: list[set[str]] = []
+    run: list[str] = []
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        if op is sre_parse.AT:
+            # zero-width, the literals around it are still adjacent
+            continue
+        if run:
+            candidates.append({"".join(run)})
+            run = []
+        literals = _required_in(op, av)
+        if literals:
+            candidates.append(literals)
+    if run:
+        candidates.append({"".join(run)})
+    # the most selective choice is the one whose shortest literal is longest
+    if not candidates:
+        return None
+    return max(candidates, key=shortest)
+
+
+def shortest(literals: set[str]) -> int:
+    return min(len(literal) for literal in literals)
+
+
+def _required_in(op: Any, av: Any) -> set[str] | None:
+    if op is sre_parse.SUBPATTERN:
+        return _required(av[-1])
+    if op is sre_parse.BRANCH:
+        literals: set[str] = set()
+        for branch in av[1]:
+            required = _required(branch)
+            if not required:
+                return None
+            literals |= required
+        return literals
+    if op is sre_parse.IN and all(o is sre_parse.LITERAL for o, _ in av):
+        # alternation of single characters, e.g. (a|b)
+        return {chr(c) for _, c in av}
+    if op in REPEATS and av[0] >= 1:
+        return _required(av[2])
+    return None
+
+
+class LiteralAutomaton:
+    """Aho-Corasick automaton finding which of many literals occur in a string
+    in a single pass, independent of the number of literals."""
+
+    def __init__(self, literals: Mapping[str, Iterable[int]]) -> None:
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        # rules with a literal ending in each state
+        self.out: list[frozenset[int]] = [frozenset()]
+        for literal, rules in literals.items():
+            self.add(literal, rules)
+        self.link()
+
+    def add(self, literal: str, rules: Iterable[int]) -> None:
+        state = 0
+        for char in literal:
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append(frozenset())
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+        self.out[state] |= frozenset(rules)
+
+    def link(self) -> None:
+        """Set failure links breadth-first and merge the outputs of each state
+        with those of its longest proper suffix."""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.out[child] |= self.out[self.fail[child]]
+
+    def search(self, text: str) -> set[int]:
+        """Rules with at least one literal occurring in text."""
+        goto, fail, out = self.goto, self.fail, self.out
+        found: set[int] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+    def __len__(self) -> int:
+        return len(self.goto)
+
+
+class BlacklistMatcher:
+    """Match lines against all blacklist rules.
+
+    Rules requiring some literal text are found with a single scan of the
+    case folded line by a LiteralAutomaton, and only the regex of those rules
+    whose literal occurs is run. The remaining rules are matched with a single
+    compiled alternation. Rules are compiled when first needed, so large rule
+    sets with known literals load fast."""
+
+    def __init__(
+        self,
+        patterns: Iterable[str],
+        flags: int = re.IGNORECASE,
+        known: Mapping[str, frozenset[str] | None] | None = None,
+    ) -> None:
+        self.patterns: tuple[str, ...] = tuple(dict.fromkeys(patterns))
+        self.flags: int = flags
+        self.rules: list[re.Pattern[str] | None] = [None] * len(self.patterns)
+        literals: dict[str, set[int]] = {}
+        self.fallback: list[int] = []
+        for i, pattern in enumerate(self.patterns):
+            if known is not None and pattern in known:
+                required = known[pattern]
+            else:
+                required = required_literals(pattern)
+            if required is None:
+                self.fallback.append(i)
+                continue
+            for literal in required:
+                literals.setdefault(literal, set()).add(i)
+        self.automaton: LiteralAutomaton | None = (
+            LiteralAutomaton(literals) if literals else None
+        )
+        self.combined: re.Pattern[str] | None = self.combine(
+            tuple(self.patterns[i] for i in self.fallback), flags
+        )
+
+    @staticmethod
+    def combine(patterns: tuple[str, ...], flags: int) -> re.Pattern[str] | None:
+        """Join rules into one alternation with a named group per rule.
+        Rules using backreferences can't be combined since group numbers shift."""
+        if not patterns or any(re.search(r"\\\d|\(\?P=", p) for p in patterns):
+            return None
+        try:
+            return re.compile(
+                "|".join(f"(?P<r{i}>{p})" for i, p in enumerate(patterns)), flags
+            )
+        except re.error:
+            return None
+
+    def rule(self, i: int) -> re.Pattern[str]:
+        compiled = self.rules[i]
+        if compiled is None:
+            compiled = self.rules[i] = re.compile(self.patterns[i], self.flags)
+        return compiled
+
+    def match(self, line: str) -> str | None:
+        """Return the rule matching the line or None.
+        Rules found by their literals are checked first, in order."""
+        if self.automaton is not None:
+            for i in sorted(self.automaton.search(fold(line))):
+                if self.rule(i).search(line):
+                    return self.patterns[i]
+        if self.combined is not None:
+            m = self.combined.search(line)
+            if m is None or m.lastgroup is None:
+                return None
+            return self.patterns[self.fallback[int(m.lastgroup[1:])]]
+        for i in self.fallback:
+            if self.rule(i).search(line):
+                return self.patterns[i]
+        return None
+
+    def __contains__(self, line: str) -> bool:
+        return self.match(line) is not None
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+
+# bounded, since a long-running worker may see any number of custom rule sets
+@lru_cache(maxsize=32)
+def compile_blacklist(
+    patterns: tuple[str, ...], packs: tuple[RulePack, ...] = ()
+) -> BlacklistMatcher:
+    """Matcher for the given rules followed by those of the rule packs,
+    reusing the literals found when the packs were validated."""
+    known: dict[str, frozenset[str] | None] = {}
+    for pack in packs:
+        known.update(zip(pack.patterns, pack.literals))
+    return BlacklistMatcher([*patterns, *known], known=known)
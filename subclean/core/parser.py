@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 from collections.abc import Callable
 from pathlib import Path
 
@@ -8,10 +10,16 @@ from subclean.core.subtitle import Subtitle, SubtitleFormat
 
 class SubtitleParser:
     @staticmethod
-    def load(path: Path) -> Subtitle:
-        if path.suffix not in SubtitleFormat.values():
-            raise NotImplementedError
+    def load(
+        path: Path, stream: bool = False, data: str | bytes | None = None
+    ) -> Subtitle:
+        if data is None and not stream:
+            if path.stat().st_size < Subtitle.mmap_threshold:
+                # read the file once, for detecting its format and for parsing
+                data = path.read_bytes()
+        format = SubtitleFormat.detect(path, data)
         logger.info("Importing subtitle {}", path)
-        handler: Callable = SubtitleFormat.get_handler(path.suffix)
-        subtitle: Subtitle = handler(path)
+        logger.debug("Found subtitle format {}", format.name)
+        handler: Callable = format.handler
+        subtitle: Subtitle = handler(path, stream, data)
         return subtitle
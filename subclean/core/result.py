@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+
+@dataclass
+class ProcessorStats:
+    name: str
+    seconds: float = 0.0
+    sections_in: int = 0
+    sections_out: int = 0
+    lines_in: int = 0
+    lines_out: int = 0
+    lines_modified: int = 0
+    # how often each rule (regex or operation) fired
+    rules: Counter[str] = field(default_factory=Counter)
+
+    @property
+    def lines_removed(self) -> int:
+        return self.lines_in - self.lines_out
+
+    def merge(self, other: ProcessorStats) -> None:
+        self.seconds += other.seconds
+        self.sections_in += other.sections_in
+        self.sections_out += other.sections_out
+        self.lines_in += other.lines_in
+        self.lines_out += other.lines_out
+        self.lines_modified += other.lines_modified
+        self.rules.update(other.rules)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            **asdict(self),
+            "lines_removed": self.lines_removed,
+            "rules": dict(self.rules.most_common()),
+        }
+
+
+@dataclass
+class CleanResult:
+    path: Path
+    output: Path | None = None
+    lines_in: int = 0
+    lines_out: int = 0
+    duration: float = 0.0
+    error: str | None = None
+    skipped: bool = False
+    stats: list[ProcessorStats] = field(default_factory=list)
+    # unified diff of the changed sections with --diff
+    diff: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def lines_removed(self) -> int:
+        return self.lines_in - self.lines_out
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "output": str(self.output) if self.output else None,
+            "ok": self.ok,
+            "error": self.error,
+            "skipped": self.skipped,
+            "lines_in": self.lines_in,
+            "lines_out": self.lines_out,
+            "lines_removed": self.lines_removed,
+            "seconds": self.duration,
+            "processors": [stats.to_dict() for stats in self.stats],
+        }
+
+    def __str__(self) -> str:
+        if not self.ok:
+            return f"failed {self.path} ({self.error})"
+        if self.skipped:
+            return f"skipped {self.path} (unchanged)"
+        return (
+            f"ok {self.path} ({self.lines_removed} lines removed, {self.duration:.2f}s)"
+        )
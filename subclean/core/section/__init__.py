@@ -1,13 +1,21 @@
 from __future__ import annotations
 
 from subclean.core.line import Line
-from subclean.core.section.timing import SectionTiming, SrtSectionTiming
+from subclean.core.section.timing import (
+    AssSectionTiming,
+    SectionTiming,
+    SrtSectionTiming,
+    VttSectionTiming,
+)
 
 
 class Section:
     def __init__(self, timing: SectionTiming, lines: list[Line] | None = None) -> None:
         self.timing: SectionTiming = timing
         self.lines: list[Line] = lines if lines is not None else []
+        # index among the sections of the input, for formats that write back
+        # the comments that came before it in place
+        self.position: int | None = None
 
     def add_line(self, line: Line) -> None:
         self.lines.append(line)
@@ -27,7 +35,7 @@ class Section:
         self.lines = [self.join()]
 
     def is_empty(self) -> bool:
-        return sum(len(line) for line in self.lines) == 0
+        return not any(len(line) for line in self.lines)
 
     def content(self) -> str:
         return "\n".join(self.lines)
@@ -47,3 +55,46 @@ class SrtSection(Section):
 
     def __str__(self) -> str:
         return f"{self.timing}\n{self.content().strip()}\n"
+
+
+class VttSection(Section):
+    def __init__(
+        self,
+        timing: VttSectionTiming,
+        lines: list[Line] | None = None,
+        identifier: str | None = None,
+    ) -> None:
+        super().__init__(timing, lines)
+        self.identifier: str | None = identifier
+
+    def __str__(self) -> str:
+        cue = f"{self.timing}\n{self.content().strip()}\n"
+        return f"{self.identifier}\n{cue}" if self.identifier else cue
+
+
+class AssSection(Section):
+    """A Dialogue event, keeping its other fields such as style and margins.
+    Lines are separated by hard line breaks (\\N) in the Text field."""
+
+    def __init__(
+        self,
+        timing: AssSectionTiming,
+        lines: list[Line] | None = None,
+        fields: dict[str, str] | None = None,
+    ) -> None:
+        super().__init__(timing, lines)
+        # fields in the order of the Format line, Start, End and Text are
+        # taken from timing and lines when written
+        self.fields: dict[str, str] = fields if fields is not None else {}
+
+    def text(self) -> str:
+        return "\\N".join(line.strip() for line in self.lines)
+
+    def __str__(self) -> str:
+        values = {
+            **self.fields,
+            "Start": self.timing.start_time,
+            "End": self.timing.end_time,
+            "Text": self.text(),
+        }
+        return f"Dialogue: {','.join(values[name] for name in self.fields)}"
@@ -1,9 +1,108 @@
+from __future__ import annotations
+
+import re
+from typing import TypeVar
+
+T = TypeVar("T", bound="SectionTiming")
+
+# also the variants found in the wild, e.g. 00:00:01:000, 00:00:01,0000
+# or 00:00:01 without milliseconds
+TIME = re.compile(r"^\s*(?:(\d+):)?(\d{1,2}):(\d{1,2})(?:[,.:](\d+))?\s*$")
+
+
 class SectionTiming:
-    def __init__(self, start_time: str, end_time: str) -> None:
-        self.start_time: str = start_time
-        self.end_time: str = end_time
+    """Start and end of a section in milliseconds."""
+
+    # between seconds and milliseconds
+    separator = "."
+
+    def __init__(self, start: int, end: int) -> None:
+        self.start: int = start
+        self.end: int = end
+
+    @classmethod
+    def from_string(cls: type[T], start_time: str, end_time: str) -> T:
+        return cls(cls.parse_time(start_time), cls.parse_time(end_time))
+
+    @staticmethod
+    def parse_time(value: str) -> int:
+        m = TIME.match(value)
+        # minutes and seconds alone would be ambiguous with hours and minutes
+        if m is None or m.group(1) is None and m.group(4) is None:
+            raise ValueError(f"Invalid time {value!r}")
+        hours, minutes, seconds, fraction = m.groups()
+        ms = int(fraction[:3].ljust(3, "0")) if fraction else 0
+        return ((int(hours or 0) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + ms
+
+    @staticmethod
+    def clock(ms: int) -> tuple[int, int, int, int]:
+        """Hours, minutes, seconds and milliseconds."""
+        seconds, ms = divmod(ms, 1000)
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        return hours, minutes, seconds, ms
+
+    @classmethod
+    def format_time(cls, ms: int) -> str:
+        # printf-style formatting is the fastest, which matters when writing
+        hours, minutes, seconds, ms = cls.clock(ms)
+        return "%02d:%02d:%02d%s%03d" % (hours, minutes, seconds, cls.separator, ms)
+
+    @property
+    def start_time(self) -> str:
+        return self.format_time(self.start)
+
+    @property
+    def end_time(self) -> str:
+        return self.format_time(self.end)
+
+    @property
+    def duration(self) -> int:
+        return self.end - self.start
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, SectionTiming):
+            return NotImplemented
+        return (self.start, self.end) == (other.start, other.end)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.start}, {self.end})"
 
 
 class SrtSectionTiming(SectionTiming):
+    separator = ","
+
+    def __init__(self, start: int, end: int, coordinates: str = "") -> None:
+        super().__init__(start, end)
+        # display coordinates following the end time, e.g. "X1:100 X2:200 Y1:10 Y2:50"
+        self.coordinates: str = coordinates
+
+    def __str__(self) -> str:
+        # formatted at once, this runs for every section written
+        timing = "%02d:%02d:%02d,%03d --> %02d:%02d:%02d,%03d" % (
+            *self.clock(self.start),
+            *self.clock(self.end),
+        )
+        return f"{timing} {self.coordinates}" if self.coordinates else timing
+
+
+class VttSectionTiming(SectionTiming):
+    def __init__(self, start: int, end: int, settings: str = "") -> None:
+        super().__init__(start, end)
+        # cue settings following the end time, e.g. "align:start line:0"
+        self.settings: str = settings
+
     def __str__(self) -> str:
-        return f"{self.start_time} --> {self.end_time}"
+        timing = f"{self.start_time} --> {self.end_time}"
+        return f"{timing} {self.settings}" if self.settings else timing
+
+
+class AssSectionTiming(SectionTiming):
+    """Times with a single digit hour and centiseconds, e.g. 0:01:29.61"""
+
+    @classmethod
+    def format_time(cls, ms: int) -> str:
+        seconds, cs = divmod((ms + 5) // 10, 100)
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        return "%d:%02d:%02d.%02d" % (hours, minutes, seconds, cs)
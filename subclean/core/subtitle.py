@@ -1,112 +1,616 @@
 from __future__ import annotations
 
+import codecs
+import io
+import mmap
+import os
+import re
 from abc import ABC, abstractmethod
-from collections.abc import Callable, Iterator
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
 from enum import Enum
+from itertools import chain, islice
 from pathlib import Path
+from typing import IO, TypeVar
 
 from loguru import logger
 
 from subclean.core.line import Line
-from subclean.core.section import Section, SrtSection
-from subclean.core.section.timing import SrtSectionTiming
+from subclean.core.section import AssSection, Section, SrtSection, VttSection
+from subclean.core.section.timing import (
+    AssSectionTiming,
+    SrtSectionTiming,
+    VttSectionTiming,
+)
+
+T = TypeVar("T", bound="Subtitle")
+
+SRT_TIMING = re.compile(r"^\d+:\d{2}:\d{2}(?:[,.:]\d+)?\s*-->", re.MULTILINE)
+
+# fields of a Dialogue event when the events have no Format line
+ASS_FORMAT = [
+    "Layer",
+    "Start",
+    "End",
+    "Style",
+    "Name",
+    "MarginL",
+    "MarginR",
+    "MarginV",
+    "Effect",
+    "Text",
+]
 
 
 class Encoding(Enum):
+    UTF_8 = "utf-8"
+    # with a byte order mark
     UTF_8_SIG = "utf-8-sig"
+    UTF_16 = "utf-16"
+    UTF_16_LE = "utf-16-le"
+    UTF_16_BE = "utf-16-be"
+    CP1252 = "cp1252"
     ISO_8859_1 = "iso-8859-1"
     NONE = None
 
+    @property
+    def ascii_compatible(self) -> bool:
+        """Whether a newline is the byte 0x0A and never part of another character."""
+        return self in (
+            Encoding.UTF_8,
+            Encoding.UTF_8_SIG,
+            Encoding.CP1252,
+            Encoding.ISO_8859_1,
+        )
+
+    @classmethod
+    def decode(cls, data: bytes, final: bool = True) -> tuple[Encoding, str]:
+        """Detect encoding from BOM and content of the raw file and decode it.
+        Without final, data is the start of a file and may end inside a
+        character, which is then left out."""
+
+        def decode(e: Encoding) -> str:
+            return str(codecs.getincrementaldecoder(e.value)().decode(data, final))
+
+        if data.startswith(codecs.BOM_UTF8):
+            return cls.UTF_8_SIG, decode(cls.UTF_8_SIG)
+        if data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return cls.UTF_16, decode(cls.UTF_16)
+        # UTF-16 without BOM, ASCII characters have a null byte on one side
+        head = data[:1024]
+        if len(head) >= 2 and head.count(0) >= len(head) // 4:
+            e = (
+                cls.UTF_16_LE
+                if head[1::2].count(0) > head[::2].count(0)
+                else cls.UTF_16_BE
+            )
+            return e, decode(e)
+        for e in (cls.UTF_8, cls.CP1252):
+            try:
+                return e, decode(e)
+            except UnicodeDecodeError:
+                pass
+        return cls.ISO_8859_1, decode(cls.ISO_8859_1)
+
+    @classmethod
+    def sniff(cls, path: Path, chunk_size: int = 1 << 20) -> Encoding:
+        """Detect encoding like decode() but without holding the file in memory."""
+        with open(path, "rb") as f:
+            head = f.read(1024)
+            bom = head.startswith(codecs.BOM_UTF8)
+            if not bom:
+                e, _ = cls.decode(head, final=False)
+                if e in (cls.UTF_16, cls.UTF_16_LE, cls.UTF_16_BE):
+                    return e
+            for e in (cls.UTF_8_SIG if bom else cls.UTF_8, cls.CP1252):
+                f.seek(0)
+                decoder = codecs.getincrementaldecoder(e.value)()
+                try:
+                    for chunk in iter(lambda: f.read(chunk_size), b""):
+                        decoder.decode(chunk)
+                    decoder.decode(b"", final=True)
+                    return e
+                except UnicodeDecodeError:
+                    pass
+        return cls.ISO_8859_1
+
+
+@contextmanager
+def atomic_open(path: Path, mode: str = "w", encoding: str = "utf-8") -> Iterator[IO]:
+    """Write to a temporary file next to path and replace path once complete,
+    so path is never left half written and may be the file being read."""
+    tmp = path.with_name(f".{path.name}.tmp")
+    try:
+        with open(tmp, mode, encoding=None if "b" in mode else encoding) as out_f:
+            yield out_f
+        copy_permissions(path, tmp)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def copy_permissions(target: Path, tmp: Path) -> None:
+    """Give the replacement the mode and, where permitted, the owner of the
+    file it replaces, like writing to the file in place would keep them."""
+    try:
+        stat = target.stat()
+    except FileNotFoundError:
+        return
+    os.chmod(tmp, stat.st_mode & 0o7777)
+    if not hasattr(os, "chown"):
+        return
+    try:
+        os.chown(tmp, stat.st_uid, stat.st_gid)
+    except OSError:
+        # only root can give a file away, but the group may still be kept
+        try:
+            os.chown(tmp, -1, stat.st_gid)
+        except OSError:
+            pass
+
 
 class Subtitle(ABC):
-    def __init__(self, filepath: Path) -> None:
+    # files this large are parsed from a memory map instead of decoded at once
+    mmap_threshold: int = 32 << 20
+    # applied to each line read, before it is parsed
+    strip_line: Callable[[str], str] = staticmethod(str.strip)
+
+    def __init__(
+        self, filepath: Path, stream: bool = False, data: str | bytes | None = None
+    ) -> None:
         self.filepath: Path = filepath
-        self.encoding: Encoding = self.load()
-        self.file: list[str]
         self.sections: list[Section] = []
-        self.parse()
+        self.encoding: Encoding
+        if data is not None:
+            # in-memory subtitle, the path is only used to name the output
+            if isinstance(data, bytes):
+                self.encoding, text = Encoding.decode(data)
+                logger.debug("Found suitable encoding {}", self.encoding)
+            else:
+                self.encoding, text = Encoding.NONE, data
+            self.parse(text)
+        elif stream:
+            # sections are parsed on demand by stream()
+            self.encoding = Encoding.sniff(filepath)
+        elif filepath.stat().st_size >= self.mmap_threshold:
+            self.encoding = Encoding.sniff(filepath)
+            self.parse_mapped()
+        else:
+            self.encoding, text = self.load()
+            self.parse(text)
 
-    def load(self) -> Encoding:
-        for e in Encoding:
-            try:
-                with open(self.filepath, encoding=e.value) as f:
-                    f.read()
-                    f.seek(0)
-                    logger.debug("Found suitable encoding {}", e)
-                    return e
-            except UnicodeDecodeError:
-                logger.warning("UnicodeDecodeError for encoding {}", e)
-        logger.error("Failed to load file. Couldn't find suitable encoding.")
-        return Encoding.NONE
+    @classmethod
+    def from_string(
+        cls: type[T], data: str | bytes, filepath: Path = Path("subtitle.srt")
+    ) -> T:
+        """Parse subtitle text or raw bytes without touching the disk."""
+        return cls(filepath, data=data)
+
+    def load(self) -> tuple[Encoding, str]:
+        """Read the file once, detect its encoding and decode it."""
+        encoding, text = Encoding.decode(self.filepath.read_bytes())
+        logger.debug("Found suitable encoding {}", encoding)
+        return encoding, text
+
+    def parse(self, text: str) -> None:
+        """Parse decoded text, which isn't kept alongside the sections."""
+        self.sections = list(self.parse_lines(self.read(text)))
+
+    def parse_mapped(self) -> None:
+        """Parse a large file without holding its raw and decoded content in memory.
+        UTF-16 can't be cut at newline bytes, so it goes through the text layer."""
+        lines = (
+            self.read_mapped() if self.encoding.ascii_compatible else self.read_file()
+        )
+        self.sections = list(self.parse_lines(lines))
 
     @abstractmethod
-    def parse(self) -> None:
+    def parse_lines(self, lines: Iterable[str]) -> Iterator[Section]:
         ...
 
+    def stream(self) -> Iterator[Section]:
+        """Parse sections lazily while reading the file line by line."""
+        return self.parse_lines(self.read_file())
+
     def add_section(self, section: Section) -> None:
         self.sections.append(section)
 
     def pop_section(self, index: int) -> None:
         self.sections.pop(index)
 
+    def count_lines(self) -> int:
+        return sum(len(section) for section in self.sections)
+
     def print(self) -> None:
         for section in self.sections:
             print(section)
 
-    def read(self) -> Iterator[str]:
+    def read(self, text: str) -> Iterator[str]:
+        for line in io.StringIO(text, newline=None):
+            yield self.strip_line(line)
+        yield ""  # append empty new line
+
+    def read_file(self) -> Iterator[str]:
         with open(self.filepath, encoding=self.encoding.value) as f:
             for line in f:
-                yield line.strip()
+                yield self.strip_line(line)
+        yield ""  # append empty new line
+
+    def read_mapped(self, block_size: int = 1 << 20) -> Iterator[str]:
+        """Like read_file(), but decode blocks of a memory-mapped file cut at line
+        ends, instead of going through the text layer line by line. Only for
+        encodings where a newline byte can't be part of another character."""
+        with open(self.filepath, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    yield from self.read_blocks(m, size, block_size)
         yield ""  # append empty new line
 
+    def read_blocks(self, m: mmap.mmap, size: int, block_size: int) -> Iterator[str]:
+        encoding = self.encoding.value
+        pos = 0
+        if self.encoding is Encoding.UTF_8_SIG:
+            # the BOM is only valid at the start of the first block
+            encoding = "utf-8"
+            if m[:3] == codecs.BOM_UTF8:
+                pos = 3
+        while pos < size:
+            end = size
+            if pos + block_size < size:
+                cut = m.rfind(b"\n", pos, pos + block_size)
+                if cut < 0:  # line longer than a block
+                    cut = m.find(b"\n", pos + block_size)
+                if cut >= 0:
+                    end = cut + 1
+            text = m[pos:end].decode(encoding)
+            if "\r" in text:
+                text = text.replace("\r\n", "\n").replace("\r", "\n")
+            lines = text.split("\n")
+            if not lines[-1]:
+                lines.pop()
+            yield from map(self.strip_line, lines)
+            pos = end
+
+    def output_path(self, path: Path | None = None) -> Path:
+        if path is None:
+            path = self.filepath.with_stem(self.filepath.stem + "_clean")
+        return path
+
+    def output_encoding(self, keep_encoding: bool = False) -> str:
+        """UTF-8, or with keep_encoding the encoding of the input,
+        including the byte order mark of UTF-8 if it had one."""
+        if not keep_encoding or self.encoding.value is None:
+            return "utf-8"
+        return str(self.encoding.value)
+
+    def encode(self, text: str, keep_encoding: bool = False) -> bytes:
+        """Encode the output, falling back to UTF-8 for text the input
+        encoding can't represent, e.g. a music note in cp1252."""
+        encoding = self.output_encoding(keep_encoding)
+        try:
+            return text.encode(encoding)
+        except UnicodeEncodeError as e:
+            self.warn_encoding(encoding, e)
+            return text.encode("utf-8")
+
+    def warn_encoding(self, encoding: str, error: UnicodeEncodeError) -> None:
+        logger.warning(
+            "Unable to encode subtitle {} as {} ({}), saving as UTF-8",
+            self.filepath,
+            encoding,
+            error.reason,
+        )
+
+    def save(self, path: Path | None = None, keep_encoding: bool = False) -> Path:
+        """Render the whole subtitle with a single join and write it at once."""
+        path = self.output_path(path)
+        data = self.encode(self.dumps(), keep_encoding)
+        logger.info("Saving subtitle {}", path)
+        with atomic_open(path, "wb") as out_f:
+            out_f.write(data)
+        return path
+
+    def dumps(self) -> str:
+        return "".join(self.render(self.sections))
+
+    def write(
+        self,
+        sections: Iterable[Section],
+        path: Path | None = None,
+        keep_encoding: bool = False,
+    ) -> Path:
+        """Write sections, which may be consumed lazily from the input file.
+        Output goes to a temporary file first, so the input can be overwritten.
+        Like encode(), falls back to UTF-8 for text the input encoding can't
+        represent, re-encoding the part of the output already written."""
+        path = self.output_path(path)
+        encoding = self.output_encoding(keep_encoding)
+        logger.info("Saving subtitle {}", path)
+        # a byte order mark is only written before the first chunk
+        encoder = codecs.getincrementalencoder(encoding)()
+        with atomic_open(path, "w+b") as out_f:
+            for chunk in self.chunks(sections):
+                try:
+                    data = encoder.encode(chunk)
+                except UnicodeEncodeError as e:
+                    self.warn_encoding(encoding, e)
+                    out_f.seek(0)
+                    written = out_f.read().decode(encoding)
+                    out_f.seek(0)
+                    out_f.truncate()
+                    out_f.write(written.encode("utf-8"))
+                    encoding = "utf-8"
+                    encoder = codecs.getincrementalencoder(encoding)()
+                    data = encoder.encode(chunk)
+                out_f.write(data)
+        return path
+
+    def dump(
+        self, sections: Iterable[Section], out_f: IO[str], chunk_size: int = 1024
+    ) -> None:
+        for chunk in self.chunks(sections, chunk_size):
+            out_f.write(chunk)
+
+    def chunks(
+        self, sections: Iterable[Section], chunk_size: int = 1024
+    ) -> Iterator[str]:
+        """The rendered pieces joined in chunks, instead of one write per
+        piece, keeping memory use bounded for streamed sections."""
+        pieces = self.render(sections)
+        while chunk := list(islice(pieces, chunk_size)):
+            yield "".join(chunk)
+
     @abstractmethod
-    def save(self, path: Path | None = None) -> None:
+    def render(self, sections: Iterable[Section]) -> Iterator[str]:
+        """The text of the subtitle in pieces, in order."""
         ...
 
 
 class SrtSubtitle(Subtitle):
-    def __init__(self, filepath: Path) -> None:
-        super().__init__(filepath)
+    def __init__(
+        self, filepath: Path, stream: bool = False, data: str | bytes | None = None
+    ) -> None:
+        super().__init__(filepath, stream, data)
 
     @staticmethod
     def __parse_timing(input: str) -> SrtSectionTiming:
-        start_time, end_time = input.split(" --> ")
-        return SrtSectionTiming(start_time, end_time)
+        start_time, end = input.split(" --> ")
+        end_time, _, coordinates = end.strip().partition(" ")
+        timing = SrtSectionTiming.from_string(start_time, end_time)
+        timing.coordinates = coordinates.strip()
+        return timing
 
-    def parse(self) -> None:
-        for line in self.read():
+    def parse_lines(self, lines: Iterable[str]) -> Iterator[SrtSection]:
+        section: SrtSection | None = None
+        for line in lines:
             # empty line (end of section) or index number (begin of section)
             if not line or line.isdigit():
                 continue
             # timing
             elif " --> " in line:
+                if section is not None:
+                    yield section
                 timing = self.__parse_timing(line)
                 section = SrtSection(timing)
-                self.sections.append(section)
             # content
+            elif section is None:
+                raise ValueError(f"Content before first timing: {line!r}")
             else:
-                self.sections[-1].add_line(Line(line))
+                section.add_line(Line(line))
+        if section is not None:
+            yield section
 
-    def save(self, path: Path | None = None) -> None:
-        if path is None:
-            path = self.filepath.with_stem(self.filepath.stem + "_clean")
-        logger.info("Saving subtitle {}", path)
-        with open(path, "w") as out_f:
-            for index, section in enumerate(self.sections, start=1):
-                out_f.write(f"{index}\n{section}\n")
+    def render(self, sections: Iterable[Section]) -> Iterator[str]:
+        for index, section in enumerate(sections, start=1):
+            # like str(section), without building it as an intermediate string
+            text = "\n".join(section.lines).strip()
+            yield f"{index}\n{section.timing}\n{text}\n\n"
+
+
+def started(sections: Iterable[Section]) -> Iterator[Section]:
+    """Sections with the first one already parsed, so the header of a streamed
+    file has been read by the time it is written."""
+    it = iter(sections)
+    first = next(it, None)
+    return it if first is None else chain((first,), it)
+
+
+def interleave(
+    sections: Iterable[Section], comments: list[tuple[int, str]]
+) -> Iterator[Section | str]:
+    """Sections with the comments, recorded with the number of sections before
+    them, in place. Comments are parsed by the time the section following them
+    is, those before removed sections come before the next one kept."""
+    index = 0
+    for section in sections:
+        position = section.position
+        while (
+            position is not None
+            and index < len(comments)
+            and comments[index][0] <= position
+        ):
+            yield comments[index][1]
+            index += 1
+        yield section
+    for _, comment in comments[index:]:
+        yield comment
+
+
+class VttSubtitle(Subtitle):
+    # header blocks are written back as read, e.g. the indented rules of a
+    # STYLE block, so lines keep their leading whitespace until parsed
+    strip_line = staticmethod(str.rstrip)
+
+    def __init__(
+        self, filepath: Path, stream: bool = False, data: str | bytes | None = None
+    ) -> None:
+        # blocks before the first cue, i.e. the WEBVTT line and
+        # STYLE, REGION or NOTE blocks
+        self.header: list[str] = []
+        # NOTE blocks between cues, with the number of cues before them
+        self.notes: list[tuple[int, str]] = []
+        super().__init__(filepath, stream, data)
+
+    @staticmethod
+    def __parse_timing(input: str) -> VttSectionTiming:
+        start_time, end = input.strip().split("-->", 1)
+        end_time, _, settings = end.strip().partition(" ")
+        timing = VttSectionTiming.from_string(start_time, end_time)
+        timing.settings = settings.strip()
+        return timing
+
+    def parse_lines(self, lines: Iterable[str]) -> Iterator[VttSection]:
+        block: list[str] = []
+        cues = 0
+        for line in chain(lines, [""]):
+            if line:
+                block.append(line)
+                continue
+            if not block:
+                continue
+            section: VttSection | None = None
+            # the timing is the first line of a cue, or the second after its identifier
+            if "-->" in block[0]:
+                section = VttSection(
+                    self.__parse_timing(block[0]),
+                    [Line(line.strip()) for line in block[1:]],
+                )
+            elif len(block) > 1 and "-->" in block[1]:
+                section = VttSection(
+                    self.__parse_timing(block[1]),
+                    [Line(line.strip()) for line in block[2:]],
+                    identifier=block[0].strip(),
+                )
+            elif not cues:
+                self.header.append("\n".join(block))
+            else:
+                self.notes.append((cues, "\n".join(block)))
+            block = []
+            if section is not None:
+                section.position = cues
+                cues += 1
+                yield section
+
+    def render(self, sections: Iterable[Section]) -> Iterator[str]:
+        sections = started(sections)
+        header = self.header
+        if not header or not header[0].startswith("WEBVTT"):
+            header = ["WEBVTT", *header]
+        for block in header:
+            yield f"{block}\n\n"
+        for item in interleave(sections, self.notes):
+            yield f"{item}\n" if isinstance(item, Section) else f"{item}\n\n"
+
+
+class AssSubtitle(Subtitle):
+    """Advanced SubStation Alpha and SubStation Alpha subtitles. Only the text of
+    Dialogue events is cleaned, everything else is written back unchanged."""
+
+    def __init__(
+        self, filepath: Path, stream: bool = False, data: str | bytes | None = None
+    ) -> None:
+        # lines up to the Format line of the events
+        self.header: list[str] = []
+        self.format: list[str] = ASS_FORMAT
+        # Comment events and other lines among the Dialogue events, with the
+        # number of Dialogue events before them
+        self.comments: list[tuple[int, str]] = []
+        # sections following the events, e.g. [Fonts]
+        self.footer: list[str] = []
+        super().__init__(filepath, stream, data)
+
+    def __parse_dialogue(self, input: str) -> AssSection:
+        values = input.partition(":")[2].lstrip().split(",", len(self.format) - 1)
+        if len(values) != len(self.format):
+            raise ValueError(f"Invalid event: {input!r}")
+        fields = dict(zip(self.format, values))
+        timing = AssSectionTiming.from_string(fields["Start"], fields["End"])
+        lines = [Line(line.strip()) for line in fields["Text"].split("\\N")]
+        return AssSection(timing, lines, fields)
+
+    def parse_lines(self, lines: Iterable[str]) -> Iterator[AssSection]:
+        events = False
+        dialogues = 0
+        for line in lines:
+            if self.footer or events and line.startswith("["):
+                self.footer.append(line)
+            elif not events:
+                self.header.append(line)
+                events = line.lower() == "[events]"
+            elif line.startswith("Dialogue:"):
+                section = self.__parse_dialogue(line)
+                section.position = dialogues
+                dialogues += 1
+                yield section
+            elif line.startswith("Format:"):
+                self.header.append(line)
+                self.format = [name.strip() for name in line[7:].split(",")]
+            elif line:
+                self.comments.append((dialogues, line))
+
+    def render(self, sections: Iterable[Section]) -> Iterator[str]:
+        sections = started(sections)
+        header = self.header
+        if not header:
+            header = ["[Events]", f"Format: {', '.join(ASS_FORMAT)}"]
+        for line in header:
+            yield f"{line}\n"
+        for item in interleave(sections, self.comments):
+            yield f"{item}\n"
+        footer = "\n".join(self.footer).strip()
+        if footer:
+            yield f"\n{footer}\n"
 
 
 class SubtitleFormat(Enum):
     def __init__(self, ext, handler) -> None:
         self.ext: str = ext
-        self.handler: Callable = handler
+        self.handler: type[Subtitle] = handler
 
     @classmethod
-    def get_handler(cls, ext: str) -> Callable:
+    def get_handler(cls, ext: str) -> type[Subtitle]:
         return list(e.handler for e in cls if e.ext == ext)[0]
 
     @classmethod
     def values(cls) -> set[str]:
         return {e.ext for e in cls}
 
+    @classmethod
+    def sniff(cls, head: str) -> SubtitleFormat | None:
+        """Recognize the format from the start of the content."""
+        text = head.lstrip("\ufeff \t\r\n")
+        if text.startswith("WEBVTT"):
+            return cls.VTT
+        if text.startswith("[Script Info]") or "[Events]" in text:
+            return cls.ASS
+        if SRT_TIMING.search(text):
+            return cls.SRT
+        return None
+
+    @classmethod
+    def detect(
+        cls, path: Path, data: str | bytes | None = None, size: int = 4096
+    ) -> SubtitleFormat:
+        """Format of the content, falling back to the file extension when the
+        content isn't recognized, e.g. a WebVTT file named .srt is WebVTT."""
+        head: str | bytes
+        if data is None:
+            with open(path, "rb") as f:
+                head = f.read(size)
+        else:
+            head = data[:size]
+        if isinstance(head, bytes):
+            _, head = Encoding.decode(head, final=False)
+        sniffed = cls.sniff(head)
+        if sniffed is not None:
+            return sniffed
+        for e in cls:
+            if e.ext == path.suffix:
+                return e
+        raise NotImplementedError(f"Unknown subtitle format: {path}")
+
     SRT = (".srt", SrtSubtitle)
+    VTT = (".vtt", VttSubtitle)
+    ASS = (".ass", AssSubtitle)
+    SSA = (".ssa", AssSubtitle)
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from itertools import islice
+
+from subclean.core.section import Section
+
+
+class Timeline:
+    """Start and end times (ms) of a run of sections in two compact integer arrays,
+    so retiming works on whole arrays instead of section by section."""
+
+    def __init__(self, starts: Iterable[int] = (), ends: Iterable[int] = ()) -> None:
+        self.starts: array[int] = array("q", starts)
+        self.ends: array[int] = array("q", ends)
+
+    @classmethod
+    def from_sections(cls, sections: Sequence[Section]) -> Timeline:
+        return cls(
+            (section.timing.start for section in sections),
+            (section.timing.end for section in sections),
+        )
+
+    def apply(self, sections: Sequence[Section]) -> None:
+        """Write times back to the sections the timeline was built from."""
+        for section, start, end in zip(sections, self.starts, self.ends):
+            section.timing.start = start
+            section.timing.end = end
+
+    def shift(self, ms: int) -> None:
+        """Move all times by ms, clamped at zero."""
+        self.starts = array("q", [max(t + ms, 0) for t in self.starts])
+        self.ends = array("q", [max(t + ms, 0) for t in self.ends])
+
+    def scale(self, factor: float) -> None:
+        self.starts = array("q", [round(t * factor) for t in self.starts])
+        self.ends = array("q", [round(t * factor) for t in self.ends])
+
+    def convert_framerate(self, source: float, target: float) -> None:
+        """Retime subtitles made for a video at source fps to the same video at
+        target fps, e.g. 23.976 to 25 for PAL speedup."""
+        self.scale(source / target)
+
+    def overlaps(self) -> list[int]:
+        """Indices of sections ending after the next one starts."""
+        return [
+            i
+            for i, (end, start) in enumerate(zip(self.ends, self.starts[1:]))
+            if end > start
+        ]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+
+def retime(
+    sections: Iterable[Section],
+    shift: int = 0,
+    framerate: tuple[float, float] | None = None,
+    chunk_size: int = 4096,
+) -> Iterator[Section]:
+    """Convert framerate, then shift, working on chunks of sections at a time
+    so it also applies to streamed sections."""
+    it = iter(sections)
+    while chunk := list(islice(it, chunk_size)):
+        timeline = Timeline.from_sections(chunk)
+        if framerate is not None:
+            timeline.convert_framerate(*framerate)
+        if shift:
+            timeline.shift(shift)
+        timeline.apply(chunk)
+        yield from chunk
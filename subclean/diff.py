@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from difflib import SequenceMatcher
+from itertools import accumulate
+from pathlib import Path
+
+from subclean.core.section import Section
+
+
+def snapshot(sections: Iterable[Section]) -> list[str]:
+    """Sections as text, without their index which changes whenever
+    an earlier section is removed."""
+    return [str(section).rstrip("\n") for section in sections]
+
+
+def section_diff(
+    before: Sequence[str], after: Sequence[str], path: Path, context: int = 1
+) -> str:
+    """Unified diff of two snapshots, comparing whole sections so that a
+    changed section shows up as one hunk. Hunk ranges count the lines of the
+    diff, followed by the ranges of sections as the hunk's trailing text."""
+    out: list[str] = []
+    matcher = SequenceMatcher(None, before, after, autojunk=False)
+    # line offset of each section, and of the end
+    a_lines = offsets(before)
+    b_lines = offsets(after)
+    for group in matcher.get_grouped_opcodes(context):
+        if not out:
+            out += [f"--- {path}", f"+++ {path}"]
+        i1, i2, j1, j2 = group[0][1], group[-1][2], group[0][3], group[-1][4]
+        lines = f"-{span(a_lines[i1], a_lines[i2])} +{span(b_lines[j1], b_lines[j2])}"
+        out.append(f"@@ {lines} @@ sections -{span(i1, i2)} +{span(j1, j2)}")
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                out += prefixed(" ", before[i1:i2])
+                continue
+            out += prefixed("-", before[i1:i2])
+            out += prefixed("+", after[j1:j2])
+    return "".join(f"{line}\n" for line in out)
+
+
+def offsets(sections: Sequence[str]) -> list[int]:
+    return [0, *accumulate(section.count("\n") + 1 for section in sections)]
+
+
+def span(start: int, stop: int) -> str:
+    """Range of lines or sections in the format of unified diff hunk headers."""
+    length = stop - start
+    if length == 1:
+        return str(start + 1)
+    return f"{start + 1 if length else start},{length}"
+
+
+def prefixed(prefix: str, sections: Sequence[str]) -> list[str]:
+    return [f"{prefix}{line}" for section in sections for line in section.split("\n")]
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from argparse import Namespace
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from subclean.blacklist import blacklist
+from subclean.core.result import CleanResult
+from subclean.processors.processor import BlacklistProcessor, Processor
+from subclean.rules import load_rules
+
+
+class Manifest:
+    """Record of previously cleaned files, used to skip files
+    whose input and configuration haven't changed since the last run."""
+
+    VERSION = 1
+
+    def __init__(self, path: Path) -> None:
+        self.path: Path = path
+        self.files: dict[str, dict[str, Any]] = {}
+        self.dirty: bool = False
+        self.load()
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            logger.warning("Ignoring unreadable manifest {}", self.path)
+            return
+        if data.get("version") != self.VERSION:
+            logger.warning("Ignoring manifest {} with unknown version", self.path)
+            return
+        self.files = data["files"]
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        logger.debug("Saving manifest {}", self.path)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(
+            json.dumps({"version": self.VERSION, "files": self.files}),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+    @staticmethod
+    def fingerprint(processors: list[type[Processor]], args: Namespace) -> str:
+        """Hash of everything besides the input that affects the output,
+        including where it is written."""
+        from subclean import __version__
+
+        output = getattr(args, "output", None)
+        config: dict[str, Any] = {
+            "overwrite": bool(getattr(args, "overwrite", False)),
+            "output": str(Path(output).resolve()) if output else None,
+            "version": __version__,
+            "processors": [processor.__name__ for processor in processors],
+            "line_length": getattr(args, "line_length", None),
+            "min_duration": getattr(args, "min_duration", None),
+            "min_gap": getattr(args, "min_gap", None),
+            "shift": getattr(args, "shift", None),
+            "fps": getattr(args, "fps", None),
+        }
+        if getattr(args, "keep_encoding", False):
+            config["keep_encoding"] = True
+        if BlacklistProcessor in processors:
+            config["blacklist"] = blacklist
+            config["regex"] = getattr(args, "regex", None)
+            config["rules"] = [
+                load_rules(Path(path)).digest
+                for path in getattr(args, "rules", None) or []
+            ]
+        return hashlib.sha256(json.dumps(config).encode()).hexdigest()
+
+    @staticmethod
+    def hash_file(path: Path) -> str:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    @classmethod
+    def describe(cls, path: Path) -> dict[str, Any]:
+        stat = path.stat()
+        return {
+            "path": str(path.resolve()),
+            "hash": cls.hash_file(path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+
+    @classmethod
+    def is_unchanged(cls, path: Path, entry: dict[str, Any]) -> bool:
+        """Compare a file against its recorded state,
+        only hashing it if size or modification time differ."""
+        try:
+            stat = path.stat()
+        except OSError:
+            return False
+        if stat.st_size != entry["size"]:
+            return False
+        if stat.st_mtime_ns == entry["mtime_ns"]:
+            return True
+        return bool(cls.hash_file(path) == entry["hash"])
+
+    @staticmethod
+    def key(path: Path) -> str:
+        return str(path.resolve())
+
+    def is_current(self, path: Path, fingerprint: str) -> bool:
+        entry = self.files.get(self.key(path))
+        return bool(
+            entry
+            and entry["fingerprint"] == fingerprint
+            and self.is_unchanged(path, entry["input"])
+            and self.is_unchanged(Path(entry["output"]["path"]), entry["output"])
+        )
+
+    def record(self, result: CleanResult, fingerprint: str) -> None:
+        if not result.ok or result.skipped or result.output is None:
+            return
+        output = self.describe(result.output)
+        # when overwriting, the cleaned file is the input of the next run
+        same = result.output.resolve() == result.path.resolve()
+        self.files[self.key(result.path)] = {
+            "fingerprint": fingerprint,
+            "input": output if same else self.describe(result.path),
+            "output": output,
+        }
+        self.dirty = True
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Iterable, Iterator, Sequence
+
+from subclean.core.result import ProcessorStats
+from subclean.core.section import Section
+from subclean.core.subtitle import Subtitle
+from subclean.processors.processor import Processor
+
+
+class Pipeline:
+    """Run a chain of processors in a single pass over the sections.
+
+    Each section goes through all processors before the next one is read.
+    Consecutive processors that only apply line operations are fused into one
+    stage, so every line runs through their operations in a single loop.
+    The output is identical to calling process() on each processor in turn.
+    With stats enabled, processors aren't fused and every stage is timed
+    and counted separately."""
+
+    def __init__(
+        self,
+        subtitle: Subtitle,
+        processors: Sequence[type[Processor]],
+        stats: bool = False,
+        **kwargs,
+    ) -> None:
+        self.subtitle: Subtitle = subtitle
+        self.processors: list[Processor] = [
+            processor(subtitle, **kwargs) for processor in processors
+        ]
+        self.stats: bool = stats
+        self.stages: list[Processor] = (
+            list(self.processors) if stats else self.fuse(subtitle, self.processors)
+        )
+
+    @staticmethod
+    def is_line_processor(processor: Processor) -> bool:
+        return (
+            type(processor).clean_section is Processor.clean_section
+            and not processor.remove_empty
+            and not processor.cross_section
+        )
+
+    @classmethod
+    def fuse(cls, subtitle: Subtitle, processors: list[Processor]) -> list[Processor]:
+        stages: list[Processor] = []
+        for processor in processors:
+            if (
+                cls.is_line_processor(processor)
+                and stages
+                and cls.is_line_processor(stages[-1])
+            ):
+                fused = Processor(subtitle)
+                fused.operations = stages[-1].operations + processor.operations
+                stages[-1] = fused
+            else:
+                stages.append(processor)
+        return stages
+
+    def collect_stats(self) -> list[ProcessorStats]:
+        if not self.stats:
+            return []
+        return [processor.stats for processor in self.processors]
+
+    def log(self) -> None:
+        for processor in self.processors:
+            processor.log()
+
+    @staticmethod
+    def measure(stage: Processor, section: Section) -> Section | None:
+        stats = stage.stats
+        before = section.lines[:]
+        start = time.perf_counter()
+        section = stage.clean_section(section)
+        keep = not (stage.remove_empty and section.is_empty())
+        stats.seconds += time.perf_counter() - start
+        stats.sections_in += 1
+        stats.lines_in += len(before)
+        if not keep:
+            return None
+        # unchanged lines are kept as the same objects
+        ids = {id(line) for line in before}
+        stats.sections_out += 1
+        stats.lines_out += len(section.lines)
+        stats.lines_modified += sum(id(line) not in ids for line in section.lines)
+        return section
+
+    @staticmethod
+    def measure_stream(
+        stage: Processor, sections: Iterable[Section]
+    ) -> Iterator[Section]:
+        """Count sections going in and out of a cross-section stage and time it,
+        excluding the time spent producing its input."""
+        stats = stage.stats
+        upstream = 0.0
+
+        def feed() -> Iterator[Section]:
+            nonlocal upstream
+            it = iter(sections)
+            while True:
+                start = time.perf_counter()
+                section = next(it, None)
+                upstream += time.perf_counter() - start
+                if section is None:
+                    return
+                stats.sections_in += 1
+                stats.lines_in += len(section)
+                yield section
+
+        out = stage.process_stream(feed())
+        while True:
+            start, before = time.perf_counter(), upstream
+            section = next(out, None)
+            stats.seconds += time.perf_counter() - start - (upstream - before)
+            if section is None:
+                return
+            stats.sections_out += 1
+            stats.lines_out += len(section)
+            yield section
+
+    def clean_section(
+        self, section: Section, stages: list[Processor] | None = None
+    ) -> Section | None:
+        if stages is None:
+            stages = self.stages
+        if self.stats:
+            for stage in stages:
+                if (cleaned := self.measure(stage, section)) is None:
+                    return None
+                section = cleaned
+            return section
+        for stage in stages:
+            section = stage.clean_section(section)
+            if stage.remove_empty and section.is_empty():
+                return None
+        return section
+
+    def run_stages(
+        self, stages: list[Processor], sections: Iterable[Section]
+    ) -> Iterator[Section]:
+        for section in sections:
+            cleaned = self.clean_section(section, stages)
+            if cleaned is not None:
+                yield cleaned
+
+    def process_stream(self, sections: Iterable[Section]) -> Iterator[Section]:
+        """Chain per-section stages in a single loop, with cross-section stages
+        consuming the output of the stages before them."""
+        stream: Iterable[Section] = sections
+        group: list[Processor] = []
+        for stage in self.stages:
+            if not stage.cross_section:
+                group.append(stage)
+                continue
+            if group:
+                stream = self.run_stages(group, stream)
+                group = []
+            stream = (
+                self.measure_stream(stage, stream)
+                if self.stats
+                else stage.process_stream(stream)
+            )
+        if group:
+            stream = self.run_stages(group, stream)
+        return iter(stream)
+
+    def process(self) -> Subtitle:
+        self.log()
+        self.subtitle.sections = list(self.process_stream(self.subtitle.sections))
+        return self.subtitle
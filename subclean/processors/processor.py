@@ -1,33 +1,68 @@
 from __future__ import annotations
 
 import re
-from argparse import Namespace
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Iterator, Sequence
 from enum import Enum
+from pathlib import Path
 
 from loguru import logger
 
 from subclean.blacklist import blacklist
+from subclean.config import CleanConfig
 from subclean.core.line import Line
+from subclean.core.matcher import BlacklistMatcher, compile_blacklist
+from subclean.core.result import ProcessorStats
 from subclean.core.section import Section
 from subclean.core.subtitle import Subtitle
+from subclean.rules import RulePack, load_rules
 
 
 class Processor:
-    def __init__(self, subtitle: Subtitle, *_, **kwargs) -> None:
+    # drop sections left without content after cleaning
+    remove_empty: bool = False
+    # needs neighbouring sections, so overrides process_stream instead of clean_section
+    cross_section: bool = False
+
+    def __init__(
+        self, subtitle: Subtitle, *_, config: CleanConfig | None = None, **kwargs
+    ) -> None:
         self.subtitle: Subtitle = subtitle
+        # parsed arguments are still accepted as cli_args
+        self.config: CleanConfig = config or CleanConfig.from_args(
+            kwargs.get("cli_args")
+        )
         self.operations: list[Callable[[Line], Line]] = []
+        self.stats: ProcessorStats = ProcessorStats(self.__class__.__name__)
 
     def log(self) -> None:
         logger.info("{processor} running", processor=self.__class__.__name__)
 
+    def hit(self, rule: str) -> None:
+        self.stats.rules[rule] += 1
+
+    def clean_line(self, line: Line) -> Line:
+        for operation in self.operations:
+            cleaned = operation(line)
+            if cleaned is not line:
+                self.hit(operation.__name__)
+            line = cleaned
+        return line
+
+    def clean_section(self, section: Section) -> Section:
+        section.lines = [self.clean_line(line) for line in section.lines]
+        return section
+
+    def process_stream(self, sections: Iterable[Section]) -> Iterator[Section]:
+        """Clean sections one at a time as they are consumed."""
+        for section in sections:
+            section = self.clean_section(section)
+            if self.remove_empty and section.is_empty():
+                continue
+            yield section
+
     def process(self) -> Subtitle:
         self.log()
-        for i, section in enumerate(self.subtitle.sections):
-            for j, line in enumerate(section.lines):
-                for operation in self.operations:
-                    line = operation(line)
-                self.subtitle.sections[i].lines[j] = line
+        self.subtitle.sections = list(self.process_stream(self.subtitle.sections))
         return self.subtitle
 
     def remove_empty_sections(self) -> None:
@@ -35,22 +70,57 @@ class Processor:
 
 
 class BlacklistProcessor(Processor):
-    def __init__(self, subtitle: Subtitle, *args, **kwargs) -> None:
+    remove_empty = True
+
+    def __init__(
+        self,
+        subtitle: Subtitle,
+        *args,
+        matcher: BlacklistMatcher | None = None,
+        **kwargs,
+    ) -> None:
         super().__init__(subtitle, *args, **kwargs)
-        cli_args: Namespace | None = kwargs.get("cli_args")
-        if cli_args and cli_args.regex:
-            self.add_custom_regex(cli_args.regex)
+        self.packs: list[RulePack] = []
+        self._matcher: BlacklistMatcher | None = matcher
+        if matcher is not None:
+            # already built for this config, e.g. shared by a Cleaner
+            self.patterns: list[str] = list(matcher.patterns)
+            return
+        self.patterns = list(blacklist)
+        for path in self.config.rules:
+            self.add_rules(path)
+        for pattern in self.config.regex:
+            self.add_custom_regex(pattern)
+
+    @staticmethod
+    def build_matcher(config: CleanConfig) -> BlacklistMatcher:
+        """Matcher for the built-in blacklist and the rules of config,
+        the same one an instance builds for that config."""
+        packs = tuple(load_rules(path) for path in config.rules)
+        return compile_blacklist((*blacklist, *config.regex), packs)
+
+    @property
+    def matcher(self) -> BlacklistMatcher:
+        if self._matcher is None:
+            self._matcher = compile_blacklist(tuple(self.patterns), tuple(self.packs))
+        return self._matcher
 
     def clean_section(self, section: Section) -> Section:
         section.lines = [line for line in section.lines if not self.in_blacklist(line)]
         return section
 
-    @staticmethod
-    def in_blacklist(line: Line) -> bool:
-        for regex in blacklist:
-            if re.search(regex, line, flags=re.IGNORECASE):
-                return True
-        return False
+    def in_blacklist(self, line: Line) -> bool:
+        rule = self.matcher.match(line)
+        if rule is None:
+            return False
+        self.hit(rule)
+        logger.debug(
+            "{processor} Removing line {!r} matching {!r}",
+            line,
+            rule,
+            processor=self.__class__.__name__,
+        )
+        return True
 
     def add_custom_regex(self, regex: str) -> None:
         logger.debug(
@@ -58,13 +128,19 @@ class BlacklistProcessor(Processor):
             regex,
             processor=self.__class__.__name__,
         )
-        blacklist.append(regex)
+        self.patterns.append(regex)
+        self._matcher = None
 
-    def process(self) -> Subtitle:
-        self.log()
-        self.subtitle.sections = [self.clean_section(s) for s in self.subtitle.sections]
-        self.remove_empty_sections()
-        return self.subtitle
+    def add_rules(self, path: Path) -> None:
+        pack = load_rules(path)
+        logger.debug(
+            "{processor} Adding {} rules from {}",
+            len(pack),
+            path,
+            processor=self.__class__.__name__,
+        )
+        self.packs.append(pack)
+        self._matcher = None
 
 
 class DialogProcessor(Processor):
@@ -77,7 +153,25 @@ class DialogProcessor(Processor):
         return line.sub(r"^(<\/?i>)*([-‐]+)(\s+)?", r"\1- ")
 
 
+SDH_PATTERNS: dict[str, re.Pattern[str]] = {
+    # no lowercase letters (except I) or punctuation
+    "uppercase": re.compile(r"^[^a-hj-z.,;?!]*$"),
+    "shouting": re.compile(r"[A-Z]{2,}|(<i>)?[♪]+(<\/i>)?"),
+    "parentheses": re.compile(r"^([-‐\s<i>]+)?[(\[*][^\)\]]+[)\]*<\/i>]+$"),
+    "music": re.compile(
+        r"^[- ♪<i>]*\s?([-‐a-z,]+\s)*\b(music(al)?|song|track)\b\s?(((play|swell)(s|ing)|intensifies|crescendo|sting)|(fades (in|out)))?\b(\s?over\s(headphones|speakers))?[\s♪<\/i>]*$|vocalizing"
+    ),
+    # speaker name or bracketed description at the beginning of the line
+    "speaker": re.compile(
+        r"^([-‐\s<i>]+)?((\b[-A-Za-z.']+\s?#?\d?){1,2}(?!\.)([\[(][\w\s]*[\])])?:(?!\w)|[\[]+.*[\]:]+)(<\/?i>)?([\s])*"
+    ),
+    "brackets": re.compile(r"[(\[*].*?[)\]*:]+"),
+}
+
+
 class SDHProcessor(Processor):
+    remove_empty = True
+
     @classmethod
     def is_hi(cls, line: Line) -> bool:
         return bool(
@@ -87,131 +181,135 @@ class SDHProcessor(Processor):
     @staticmethod
     def is_simple_hi(line: Line) -> bool:
         return bool(
-            re.search(r"^[^a-hj-z.,;?!]*$", line)
-            and re.search(r"[A-Z]{2,}|(<i>)?[♪]+(<\/i>)?", line)
+            SDH_PATTERNS["uppercase"].search(line)
+            and SDH_PATTERNS["shouting"].search(line)
         )
 
     @staticmethod
     def is_parentheses(line: Line) -> bool:
-        return bool(re.search(r"^([-‐\s<i>]+)?[(\[*][^\)\]]+[)\]*<\/i>]+$", line))
+        return bool(SDH_PATTERNS["parentheses"].search(line))
 
     @staticmethod
     def is_music(line: Line) -> bool:
-        return bool(
-            re.search(
-                r"^[- ♪<i>]*\s?([-‐a-z,]+\s)*\b(music(al)?|song|track)\b\s?(((play|swell)(s|ing)|intensifies|crescendo|sting)|(fades (in|out)))?\b(\s?over\s(headphones|speakers))?[\s♪<\/i>]*$|vocalizing",
-                line,
-            )
-        )
+        return bool(SDH_PATTERNS["music"].search(line))
 
     @staticmethod
     def contains_hi(line: Line) -> bool:
         return bool(
-            re.search(
-                r"^([-‐\s<i>]+)?((\b[-A-Za-z.']+\s?#?\d?){1,2}(?!\.)([\[(][\w\s]*[\])])?:(?!\w)|[\[]+.*[\]:]+)(<\/?i>)?([\s])*|\s?[(\[*].*?[)\]*:]+\s?",
-                line,
-            )
+            SDH_PATTERNS["speaker"].search(line)
+            or SDH_PATTERNS["brackets"].search(line)
         )
 
     @classmethod
     def clean_hi(cls, line: Line) -> Line:
         """Clean hearing impaired."""
-        line = line.sub(
-            r"^([-‐\s<i>]+)?((\b[-A-Za-z.']+\s?#?\d?){1,2}(?!\.)([\[(][\w\s]*[\])])?:(?!\w)|[\[]+.*[\]:]+)(<\/?i>)?([\s])*",
-            r"\1\5",
-        )
+        line = line.sub(SDH_PATTERNS["speaker"], r"\1\5")
         line = cls.clean_parentheses(line)
         return line
 
     @staticmethod
     def is_parenthesis_not_matching(line: Line) -> bool:
-        return bool(
-            re.search(r"[()\[\]]", line)
-            and (
-                line.count("(") != line.count(")") or line.count("[") != line.count("]")
-            )
-        )
+        return line.count("(") != line.count(")") or line.count("[") != line.count("]")
 
     @staticmethod
     def clean_parentheses(line: Line) -> Line:
         """Clean parentheses ()[]."""
-        return line.sub(r"[(\[*].*?[)\]*:]+", "")
+        return line.sub(SDH_PATTERNS["brackets"], "")
 
     @classmethod
-    def clean_section(cls, section: Section) -> Section:
+    def classify(cls, line: Line) -> tuple[str | None, Line]:
+        """Return the rule that fired and the cleaned line.
+        Lines that are entirely hearing impaired are returned empty."""
+        if cls.is_simple_hi(line):
+            return "is_simple_hi", Line()
+        if cls.is_parentheses(line):
+            return "is_parentheses", Line()
+        if cls.is_music(line):
+            return "is_music", Line()
+        if cls.is_parenthesis_not_matching(line):
+            return "is_parenthesis_not_matching", Line()
+        # removing the speaker and brackets directly tells whether there were any
+        cleaned, speakers = SDH_PATTERNS["speaker"].subn(r"\1\5", line, count=1)
+        cleaned, brackets = SDH_PATTERNS["brackets"].subn("", cleaned)
+        if not speakers and not brackets:
+            return None, line
+        return "contains_hi", line if cleaned == line else Line(cleaned)
+
+    def clean_section(self, section: Section) -> Section:
         lines: list[Line] = []
         for line in section.lines:
-            if cls.is_hi(line) or cls.is_parenthesis_not_matching(line):
+            rule, cleaned = self.classify(line)
+            if rule is None:
+                lines.append(line)
                 continue
-            elif cls.contains_hi(line):
-                line = cls.clean_hi(line)
-            lines.append(line)
+            self.hit(rule)
+            if rule == "contains_hi":
+                lines.append(cleaned)
         section.lines = lines
         return section
 
-    def process(self) -> Subtitle:
-        self.log()
-        # Clean sections
-        self.subtitle.sections = [self.clean_section(s) for s in self.subtitle.sections]
-        self.remove_empty_sections()
-        return self.subtitle
-
 
 class LineLengthProcessor(Processor):
     line_length = 50
 
     def __init__(self, subtitle: Subtitle, *args, **kwargs) -> None:
         super().__init__(subtitle, *args, **kwargs)
-        cli_args: Namespace | None = kwargs.get("cli_args")
-        if cli_args and cli_args.line_length:
+        if self.config.line_length:
             logger.debug(
                 "{processor} Setting line length to {}",
-                cli_args.line_length,
+                self.config.line_length,
                 processor=self.__class__.__name__,
             )
-            self.__class__.line_length = cli_args.line_length
+            self.line_length = self.config.line_length
 
-    @classmethod
-    def is_short(cls, line: Line) -> bool:
-        return len(line) < cls.line_length
+    def is_short(self, line: Line) -> bool:
+        return len(line) < self.line_length
 
     @staticmethod
-    def split_dialog_chunks(lines: list[Line]) -> list[list[Line]]:
-        chunks: list[list[Line]] = []
-        i: int = 1
-        while lines:
-            if not len(lines) > max(i, 1):
-                chunks.append(lines)
-                break
-            elif lines[i].is_dialog():
-                chunks.append(lines[:i])
-                lines = lines[i:]
-                i = 1
-            else:
-                i += 1
-        return chunks
+    def dialog_chunks(lines: Sequence[Line]) -> Iterator[tuple[int, int]]:
+        """Start and end index of each chunk of lines, a new chunk starting
+        at every dialog line except the first line."""
+        start = 0
+        for i in range(1, len(lines)):
+            if lines[i].is_dialog():
+                yield start, i
+                start = i
+        if lines:
+            yield start, len(lines)
 
     @classmethod
-    def process_section(cls, section: Section) -> Section:
-        if not len(section) > 1:
+    def split_dialog_chunks(cls, lines: list[Line]) -> list[list[Line]]:
+        return [lines[start:end] for start, end in cls.dialog_chunks(lines)]
+
+    def fits(self, lines: Sequence[Line], start: int, end: int) -> bool:
+        """Whether lines[start:end] merged would be short, from the cached
+        lengths of the lines without building the merged line."""
+        length = end - start - 1  # joining spaces
+        for i in range(start, end):
+            length += len(lines[i])
+            if length >= self.line_length:
+                return False
+        return True
+
+    def process_section(self, section: Section) -> Section:
+        lines = section.lines
+        if not len(lines) > 1:
             return section
-        chunks = cls.split_dialog_chunks(section.lines)
-        section.lines = []
-        for chunk in chunks:
-            if not len(chunk) > 1:
-                section.lines.append(chunk[0])
-            elif cls.is_short(Line.merge(chunk)):
-                section.lines.append(Line.merge(chunk))
-            else:
-                section.lines += chunk
+        merged: list[Line] | None = None
+        for start, end in self.dialog_chunks(lines):
+            if end - start > 1 and self.fits(lines, start, end):
+                self.hit("merge")
+                if merged is None:
+                    merged = lines[:start]
+                merged.append(Line.merge(lines[start:end]))
+            elif merged is not None:
+                merged += lines[start:end]
+        if merged is not None:
+            section.lines = merged
         return section
 
-    def process(self) -> Subtitle:
-        self.log()
-        self.subtitle.sections = [
-            self.process_section(section) for section in self.subtitle.sections
-        ]
-        return self.subtitle
+    def clean_section(self, section: Section) -> Section:
+        return self.process_section(section)
 
 
 class ErrorProcessor(Processor):
@@ -277,6 +375,69 @@ class StyleProcessor(Processor):
         return line.sub(r"<\/?i>(\s*)<\/?i>", r"\1")
 
 
+class TimingProcessor(Processor):
+    """Clean up timings in a single pass over the sections, looking at each
+    section together with the next one."""
+
+    cross_section = True
+    # milliseconds
+    min_duration: int = 800
+    min_gap: int = 80
+
+    def __init__(self, subtitle: Subtitle, *args, **kwargs) -> None:
+        super().__init__(subtitle, *args, **kwargs)
+        if self.config.min_duration is not None:
+            self.min_duration = self.config.min_duration
+        if self.config.min_gap is not None:
+            self.min_gap = self.config.min_gap
+
+    def is_duplicate(self, section: Section, following: Section) -> bool:
+        """Same text continuing directly after the previous section."""
+        return (
+            section.lines == following.lines
+            and following.timing.start - section.timing.end <= self.min_gap
+        )
+
+    def fit(self, section: Section, next_start: int | None) -> None:
+        """Extend sections shorter than the minimum duration and trim sections
+        overlapping or too close to the next one, as far as that is possible."""
+        timing = section.timing
+        end = max(timing.end, timing.start + self.min_duration)
+        if next_start is not None:
+            if next_start - self.min_gap > timing.start:
+                end = min(end, next_start - self.min_gap)
+            elif next_start > timing.start:
+                end = min(end, next_start)
+        if end > timing.end:
+            self.hit("extend_duration")
+        elif end < timing.end:
+            self.hit(
+                "fix_overlap"
+                if next_start is not None and timing.end > next_start
+                else "enforce_gap"
+            )
+        timing.end = end
+
+    def process_stream(self, sections: Iterable[Section]) -> Iterator[Section]:
+        previous: Section | None = None
+        for section in sections:
+            if section.timing.end <= section.timing.start:
+                self.hit("drop_invalid")
+                continue
+            if previous is None:
+                previous = section
+            elif self.is_duplicate(previous, section):
+                self.hit("merge_duplicate")
+                previous.timing.end = max(previous.timing.end, section.timing.end)
+            else:
+                self.fit(previous, section.timing.start)
+                yield previous
+                previous = section
+        if previous is not None:
+            self.fit(previous, None)
+            yield previous
+
+
 class Processors(Enum):
     def __str__(self) -> str:
         return self.name
@@ -287,6 +448,7 @@ class Processors(Enum):
     Blacklist = BlacklistProcessor
     LineLength = LineLengthProcessor
     Style = StyleProcessor
+    Timing = TimingProcessor
 
 
 DEFAULT_PROCESSORS = [
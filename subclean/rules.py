@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from subclean.core.matcher import required_literals
+
+# bump when the cached form changes
+CACHE_VERSION = 1
+
+
+class RuleError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class RulePack:
+    """Validated blacklist rules from a file, with the literals the
+    blacklist matcher prefilters each rule by."""
+
+    path: Path
+    digest: str
+    patterns: tuple[str, ...]
+    literals: tuple[frozenset[str] | None, ...]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+
+def cache_dir() -> Path:
+    if "SUBCLEAN_CACHE_DIR" in os.environ:
+        return Path(os.environ["SUBCLEAN_CACHE_DIR"])
+    xdg = os.environ.get("XDG_CACHE_HOME")
+    return (Path(xdg) if xdg else Path.home() / ".cache") / "subclean"
+
+
+def rule_format(path: Path) -> str:
+    """How a rule file is parsed, by its extension."""
+    return {".toml": "toml", ".yaml": "yaml", ".yml": "yaml"}.get(path.suffix, "text")
+
+
+def cache_path(digest: str, syntax: str) -> Path:
+    # the same bytes give different rules depending on how they are parsed,
+    # and literals are extracted with the re module's parser, which may change
+    python = f"py{sys.version_info[0]}{sys.version_info[1]}"
+    name = f"{digest}-{syntax}-{python}-v{CACHE_VERSION}.json"
+    return cache_dir() / "rules" / name
+
+
+def parse_text(text: str) -> list[tuple[int, str]]:
+    """One rule per line, ignoring blank lines and lines starting with #."""
+    return [
+        (lineno, line.strip())
+        for lineno, line in enumerate(text.splitlines(), start=1)
+        if line.strip() and not line.lstrip().startswith("#")
+    ]
+
+
+def parse_toml(text: str) -> Any:
+    if sys.version_info >= (3, 11):
+        import tomllib
+    else:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise RuleError("TOML rules require Python 3.11 or the tomli package")
+    return tomllib.loads(text)
+
+
+def parse_yaml(text: str) -> Any:
+    try:
+        import yaml  # type: ignore[import]
+    except ImportError:
+        raise RuleError("YAML rules require the PyYAML package")
+    return yaml.safe_load(text)
+
+
+def parse_rules(path: Path, text: str) -> list[tuple[int, str]]:
+    """Rules with their line number for text files or index otherwise.
+    TOML and YAML files hold a list of patterns under the key "rules"."""
+    syntax = rule_format(path)
+    if syntax != "text":
+        data = parse_toml(text) if syntax == "toml" else parse_yaml(text)
+        rules = data.get("rules") if isinstance(data, dict) else None
+        if not isinstance(rules, list) or not all(isinstance(r, str) for r in rules):
+            raise RuleError(f"{path}: expected a list of patterns under 'rules'")
+        return list(enumerate(rules, start=1))
+    return parse_text(text)
+
+
+def validate(path: Path, digest: str, rules: list[tuple[int, str]]) -> RulePack:
+    patterns: list[str] = []
+    for position, pattern in rules:
+        try:
+            re.compile(pattern, re.IGNORECASE)
+        except re.error as e:
+            raise RuleError(f"{path}:{position}: invalid rule {pattern!r}: {e}")
+        patterns.append(pattern)
+    unique = tuple(dict.fromkeys(patterns))
+    return RulePack(
+        path, digest, unique, tuple(required_literals(pattern) for pattern in unique)
+    )
+
+
+def read_cache(path: Path) -> tuple[tuple[str, ...], tuple[frozenset[str] | None, ...]]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return tuple(data["patterns"]), tuple(
+        None if literals is None else frozenset(literals)
+        for literals in data["literals"]
+    )
+
+
+def write_cache(path: Path, pack: RulePack) -> None:
+    data = {
+        "source": str(pack.path),
+        "patterns": pack.patterns,
+        "literals": [
+            None if literals is None else sorted(literals) for literals in pack.literals
+        ],
+    }
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.debug("Unable to cache rules {}: {}", pack.path, e)
+
+
+def load_rules(path: Path) -> RulePack:
+    """Load a rule file, validating it only the first time its content is seen.
+    Validated rules are cached on disk keyed by the hash and format of the file."""
+    try:
+        data = path.read_bytes()
+    except OSError as e:
+        raise RuleError(f"Unable to read rules {path}: {e.strerror}")
+    return load_pack(path, hashlib.sha256(data).hexdigest(), data)
+
+
+@lru_cache(maxsize=64)
+def load_pack(path: Path, digest: str, data: bytes) -> RulePack:
+    cached = cache_path(digest, rule_format(path))
+    try:
+        patterns, literals = read_cache(cached)
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    else:
+        logger.debug("Loaded {} cached rules from {}", len(patterns), path)
+        return RulePack(path, digest, patterns, literals)
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise RuleError(f"{path}: rules must be UTF-8")
+    pack = validate(path, digest, parse_rules(path, text))
+    logger.debug("Loaded {} rules from {}", len(pack), path)
+    write_cache(cached, pack)
+    return pack
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import json
+import socketserver
+import sys
+from argparse import Namespace
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from subclean.api import Cleaner, resolve_options, resolve_processors
+from subclean.batch import clean_file
+from subclean.cli import build_parser
+from subclean.config import CleanConfig
+from subclean.processors.processor import Processor, Processors
+
+# cleaned once on startup so the first request doesn't pay for compiling patterns
+WARM_UP = "1\n00:00:01,000 --> 00:00:02,000\n[MUSIC] JOHN: Hello,\n<i>world</i>\n"
+
+
+class Worker:
+    """Clean subtitles on request, keeping the processor configuration
+    and compiled patterns warm between requests.
+
+    Every request is a JSON object on a single line and gets a JSON response
+    on a single line, e.g.
+    {"id": 1, "file": "movie.srt", "options": {"overwrite": true}}
+    {"id": 2, "text": "1\\n00:00:01,000 --> ...", "processors": ["SDH"]}"""
+
+    def __init__(self, args: Namespace) -> None:
+        # server options like the socket path don't apply to requests
+        self.defaults: Namespace = Namespace(
+            **{key: value for key, value in vars(args).items() if key != "socket"}
+        )
+        self.processors: list[type[Processor]] = resolve_processors(args.processors)
+        # built once per combination of processors and options seen recently,
+        # bounded so requests with ever new options don't grow the worker
+        self.cleaner = lru_cache(maxsize=16)(Cleaner)
+        self.warm_up()
+
+    def warm_up(self) -> None:
+        logger.disable("subclean")
+        try:
+            self.cleaner(
+                tuple(self.processors), CleanConfig.from_args(self.defaults)
+            ).clean_text(WARM_UP)
+        finally:
+            logger.enable("subclean")
+
+    def handle(self, request: dict[str, Any]) -> dict[str, Any]:
+        response: dict[str, Any] = {"id": request["id"]} if "id" in request else {}
+        try:
+            processors = self.processors
+            if "processors" in request:
+                processors = resolve_processors(
+                    [Processors[name] for name in request["processors"]]
+                )
+            args = resolve_options(request.get("options"), self.defaults)
+            if "text" in request:
+                config = CleanConfig.from_args(args)
+                # rule files are read again, in case they were edited meanwhile
+                cleaner = (
+                    Cleaner(processors, config)
+                    if config.rules
+                    else self.cleaner(tuple(processors), config)
+                )
+                text = cleaner.clean_text(request["text"])
+                return {**response, "ok": True, "text": text}
+            if "file" not in request:
+                raise ValueError("Request needs either 'file' or 'text'")
+            result = clean_file(Path(request["file"]), processors, args)
+            return {**response, **result.to_dict()}
+        except Exception as e:
+            return {**response, "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    def handle_line(self, line: str) -> str:
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            return json.dumps({"ok": False, "error": f"Invalid JSON: {e}"})
+        if not isinstance(request, dict):
+            return json.dumps({"ok": False, "error": "Request must be a JSON object"})
+        return json.dumps(self.handle(request))
+
+
+def serve_stdin(worker: Worker) -> None:
+    for line in sys.stdin:
+        if line.strip():
+            print(worker.handle_line(line), flush=True)
+
+
+def serve_socket(worker: Worker, path: Path) -> None:
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            for line in self.rfile:
+                if line.strip():
+                    response = worker.handle_line(line.decode("utf-8"))
+                    self.wfile.write(response.encode("utf-8") + b"\n")
+
+    path.unlink(missing_ok=True)
+    with socketserver.ThreadingUnixStreamServer(str(path), Handler) as server:
+        server.daemon_threads = True
+        logger.info("Listening on {}", path)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            path.unlink(missing_ok=True)
+
+
+def parse_args(args: list[str] | None = None) -> Namespace:
+    parser = build_parser()
+    parser.prog = "subclean serve"
+    parser.description = (
+        "Clean subtitles on request, reading JSON lines from stdin or a Unix socket. "
+        "Options given here are the defaults for every request."
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        type=Path,
+        help="Listen on a Unix socket instead of stdin",
+    )
+    namespace = parser.parse_args(args)
+    if namespace.file or namespace.recursive or namespace.output:
+        parser.error("FILE, --recursive and --output are given per request")
+    return namespace
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    # stdout carries the responses
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+    worker = Worker(args)
+    if args.socket is not None:
+        serve_socket(worker, args.socket)
+    else:
+        serve_stdin(worker)
+
+
+if __name__ == "__main__":
+    main()
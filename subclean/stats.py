@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from subclean.core.result import CleanResult, ProcessorStats
+
+
+def format_table(stats: list[ProcessorStats]) -> str:
+    rows = [
+        (
+            "processor",
+            "time",
+            "sections",
+            "lines",
+            "removed",
+            "modified",
+            "top rule",
+        )
+    ]
+    for s in stats:
+        top = ""
+        if s.rules:
+            rule, count = s.rules.most_common(1)[0]
+            top = f"{count}x {rule if len(rule) <= 30 else rule[:29] + '…'}"
+        rows.append(
+            (
+                s.name,
+                f"{s.seconds * 1000:.1f}ms",
+                f"{s.sections_in}->{s.sections_out}",
+                f"{s.lines_in}->{s.lines_out}",
+                str(s.lines_removed),
+                str(s.lines_modified),
+                top,
+            )
+        )
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+        for row in rows
+    )
+
+
+class StatsReport:
+    """Collects processor statistics of all files cleaned in a run,
+    logging a table per file and writing everything as JSON at the end."""
+
+    def __init__(
+        self, table: bool = False, json_path: str | None = None, summary: bool = False
+    ) -> None:
+        self.table: bool = table
+        self.json_path: str | None = json_path
+        # log the table of all files even for a single file
+        self.summary: bool = summary
+        self.results: list[CleanResult] = []
+        self.total: dict[str, ProcessorStats] = {}
+
+    def add(self, result: CleanResult) -> None:
+        if not result.stats:
+            return
+        self.results.append(result)
+        for stats in result.stats:
+            self.total.setdefault(stats.name, ProcessorStats(stats.name)).merge(stats)
+        if self.table:
+            logger.info(
+                "Processor statistics for {}\n{}",
+                result.path,
+                format_table(result.stats),
+            )
+
+    def finish(self) -> None:
+        if self.results and (self.summary or self.table and len(self.results) > 1):
+            logger.info(
+                "Processor statistics for {} files\n{}",
+                len(self.results),
+                format_table(list(self.total.values())),
+            )
+        if self.json_path:
+            self.write_json(self.json_path)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "files": [
+                {
+                    "path": str(result.path),
+                    "seconds": result.duration,
+                    "processors": [stats.to_dict() for stats in result.stats],
+                }
+                for result in self.results
+            ],
+            "total": [stats.to_dict() for stats in self.total.values()],
+        }
+
+    def write_json(self, path: str) -> None:
+        data = json.dumps(self.to_dict(), indent=2)
+        if path == "-":
+            print(data, file=sys.stdout)
+        else:
+            Path(path).write_text(data + "\n", encoding="utf-8")
@@ -2,41 +2,232 @@
 from __future__ import annotations
 
 import sys
+import time
 from argparse import Namespace
+from collections import Counter
+from collections.abc import Iterable, Iterator
 from pathlib import Path
+from typing import TYPE_CHECKING, TextIO
 
 from loguru import logger
 
-from subclean.cli import parse_args
-from subclean.core.parser import SubtitleParser
-from subclean.core.subtitle import Subtitle
-from subclean.processors.processor import Processor
+from subclean.cli import handle_version, parse_args
+from subclean.core.result import CleanResult
 
+# parsing and cleaning are imported when first used, so that commands like
+# --version don't pay for importing processors and compiling patterns
+if TYPE_CHECKING:
+    from subclean.config import CleanConfig
+    from subclean.core.section import Section
+    from subclean.core.subtitle import Subtitle
+    from subclean.manifest import Manifest
+    from subclean.processors.processor import Processor
+    from subclean.stats import StatsReport
 
-def subclean(f: Path, processors: list[type[Processor]], args: Namespace) -> None:
-    subtitle: Subtitle = SubtitleParser.load(f)
-    for processor in processors:
-        subtitle = processor(subtitle, cli_args=args).process()
-    if args.overwrite:
-        args.output = f
-    subtitle.save(args.output)
 
+def subclean(
+    f: Path,
+    processors: list[type[Processor]],
+    args: Namespace,
+    manifest: Manifest | None = None,
+) -> CleanResult:
+    start = time.perf_counter()
+    fingerprint = ""
+    if manifest is not None:
+        fingerprint = manifest.fingerprint(processors, args)
+        if manifest.is_current(f, fingerprint):
+            logger.info("Skipping unchanged subtitle {}", f)
+            return CleanResult(f, skipped=True)
+    output = f if args.overwrite else args.output
+    path = Path(output) if output else None
+    if getattr(args, "stream", False):
+        result = subclean_stream(f, processors, args, path)
+    else:
+        from subclean.core.parser import SubtitleParser
 
-def main(argv: list[str] | None = None) -> None:
-    args = parse_args(argv)
+        subtitle: Subtitle = SubtitleParser.load(f)
+        result = clean(subtitle, processors, args)
+        if getattr(args, "dry_run", False):
+            result.output = subtitle.output_path(path)
+            logger.info("Dry run, not saving subtitle {}", result.output)
+        else:
+            result.output = subtitle.save(path, keep_encoding(args))
+    result.duration = time.perf_counter() - start
+    if manifest is not None and not getattr(args, "dry_run", False):
+        manifest.record(result, fingerprint)
+    return result
+
+
+def clean(
+    subtitle: Subtitle, processors: list[type[Processor]], args: Namespace
+) -> CleanResult:
+    """Run processors and retiming on a loaded subtitle, in place."""
+    from subclean.config import CleanConfig
+    from subclean.diff import section_diff, snapshot
+    from subclean.processors.pipeline import Pipeline
+
+    lines_in = subtitle.count_lines()
+    before = snapshot(subtitle.sections) if getattr(args, "diff", False) else None
+    pipeline = Pipeline(
+        subtitle, processors, wants_stats(args), config=CleanConfig.from_args(args)
+    )
+    pipeline.process()
+    subtitle.sections = list(retime_sections(subtitle.sections, args))
+    result = CleanResult(
+        subtitle.filepath,
+        lines_in=lines_in,
+        lines_out=subtitle.count_lines(),
+        stats=pipeline.collect_stats(),
+    )
+    if before is not None:
+        after = snapshot(subtitle.sections)
+        result.diff = section_diff(before, after, subtitle.filepath)
+    return result
+
+
+def subclean_stream(
+    f: Path,
+    processors: list[type[Processor]],
+    args: Namespace,
+    output: Path | None = None,
+) -> CleanResult:
+    """Pass sections from the reader through all processors to the writer
+    one at a time, so memory use doesn't depend on the size of the file."""
+    from subclean.config import CleanConfig
+    from subclean.core.parser import SubtitleParser
+    from subclean.processors.pipeline import Pipeline
+
+    subtitle: Subtitle = SubtitleParser.load(f, stream=True)
+    lines: Counter[str] = Counter()
+
+    def count(sections: Iterable[Section], key: str) -> Iterator[Section]:
+        for section in sections:
+            lines[key] += len(section)
+            yield section
+
+    pipeline = Pipeline(
+        subtitle, processors, wants_stats(args), config=CleanConfig.from_args(args)
+    )
+    pipeline.log()
+    sections = retime_sections(
+        pipeline.process_stream(count(subtitle.stream(), "in")), args
+    )
+    saved = subtitle.write(count(sections, "out"), output, keep_encoding(args))
+    return CleanResult(
+        f,
+        saved,
+        lines_in=lines["in"],
+        lines_out=lines["out"],
+        stats=pipeline.collect_stats(),
+    )
+
+
+def retime_sections(
+    sections: Iterable[Section], args: Namespace | CleanConfig
+) -> Iterable[Section]:
+    shift: int = getattr(args, "shift", 0) or 0
+    fps: tuple[float, float] | None = getattr(args, "fps", None)
+    if not shift and fps is None:
+        return sections
+    logger.info("Retiming subtitle (shift: {}ms, framerate: {})", shift, fps)
+    from subclean.core.timeline import retime
+
+    return retime(sections, shift, fps)
+
+
+def keep_encoding(args: Namespace) -> bool:
+    return bool(getattr(args, "keep_encoding", False))
+
+
+def wants_stats(args: Namespace) -> bool:
+    return bool(
+        getattr(args, "stats", False)
+        or getattr(args, "stats_json", None)
+        or getattr(args, "dry_run", False)
+    )
+
+
+# optional features are only imported when used, to keep startup fast
+def load_manifest(args: Namespace) -> Manifest | None:
+    if not args.manifest:
+        return None
+    from subclean.manifest import Manifest
+
+    return Manifest(args.manifest)
+
+
+def stats_report(args: Namespace) -> StatsReport | None:
+    if not wants_stats(args):
+        return None
+    from subclean.stats import StatsReport
+
+    # a dry run summarizes what each processor would change
+    return StatsReport(args.stats, args.stats_json, summary=args.dry_run)
+
+
+def print_diff(result: CleanResult) -> None:
+    if result.diff:
+        sys.stdout.write(result.diff)
+
+
+def setup_logger(level: str, sink: TextIO = sys.stdout) -> None:
     logger.remove()
     logger.add(
-        sys.stdout,
+        sink,
         colorize=True,
         format="<g>{time:HH:mm:ss.SSS}</> | <lvl>{level: <8}</> | <lvl>{message}</lvl>",
-        level=args.log_level,
+        level=level,
     )
 
+
+def piped(args: Namespace) -> bool:
+    """Whether stdout is kept to the diff or statistics, so they can be piped
+    to other tools, and logging goes to stderr instead."""
+    return bool(
+        getattr(args, "diff", False) or getattr(args, "stats_json", None) == "-"
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[:1] == ["bench"]:
+        from subclean import bench
+
+        return bench.main(argv[1:])
+    if argv[:1] == ["serve"]:
+        from subclean import serve
+
+        return serve.main(argv[1:])
+    handle_version(argv)
+    args = parse_args(argv)
+    setup_logger(args.log_level, sys.stderr if piped(args) else sys.stdout)
+
     processors: list[type[Processor]] = [
         processor.value for processor in args.processors
     ]
-    for f in args.file:
-        subclean(Path(f.name), processors, args)
+    manifest = load_manifest(args)
+    report = stats_report(args)
+    try:
+        if args.recursive or args.jobs > 1 or args.async_io:
+            from subclean import batch
+
+            paths = [Path(f.name) for f in args.file]
+            for root in args.recursive:
+                paths += batch.find_subtitles(root)
+            if batch.run(paths, processors, args, manifest, report):
+                sys.exit(1)
+            return
+        for f in args.file:
+            result = subclean(Path(f.name), processors, args, manifest)
+            print_diff(result)
+            if report is not None:
+                report.add(result)
+    finally:
+        if manifest is not None:
+            manifest.save()
+        if report is not None:
+            report.finish()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from subclean import Cleaner, clean_text
+from subclean.core.subtitle import Encoding, SrtSubtitle, SubtitleFormat
+from subclean.processors.processor import Processors, StyleProcessor
+
+
+class TestApi:
+    def test_from_string(self):
+        text = Path("tests/resources/sub.srt").read_text(encoding="utf-8-sig")
+        subtitle = SrtSubtitle.from_string(text)
+        assert len(subtitle.sections) == 667
+        assert subtitle.encoding == Encoding.NONE
+        assert subtitle.dumps().startswith("1\n00:00:06,605 --> 00:00:08,845\n")
+
+    def test_from_bytes(self):
+        data = "1\n00:00:01,000 --> 00:00:02,000\nSchön\n".encode("cp1252")
+        subtitle = SrtSubtitle.from_string(data)
+        assert subtitle.encoding == Encoding.CP1252
+        assert subtitle.sections[0].lines == ["Schön"]
+
+    def test_clean_text(self):
+        for input_path in Path("tests/subs").glob("*.input.srt"):
+            ref_path = input_path.with_suffix("").with_suffix(".ref.srt")
+            assert clean_text(input_path.read_bytes()) == ref_path.read_text()
+
+    def test_formats(self):
+        vtt = "WEBVTT\n\n00:01.000 --> 00:02.000\n[MUSIC PLAYING]\nHello\n"
+        assert clean_text(vtt, format=SubtitleFormat.VTT) == (
+            "WEBVTT\n\n00:00:01.000 --> 00:00:02.000\nHello\n\n"
+        )
+        ass = (
+            "[Events]\nDialogue: 0,0:00:01.00,0:00:02.00,Default,,0,0,0,,(laughs) Hi\n"
+        )
+        assert clean_text(ass, format=SubtitleFormat.ASS).endswith(
+            "Dialogue: 0,0:00:01.00,0:00:02.00,Default,,0,0,0,,Hi\n"
+        )
+        # recognized from the content
+        assert clean_text(vtt) == clean_text(vtt, format=SubtitleFormat.VTT)
+        assert clean_text(ass.encode("utf-16")).endswith(",,Hi\n")
+
+    def test_cleaner(self, tmp_path: Path, monkeypatch):
+        monkeypatch.setenv("SUBCLEAN_CACHE_DIR", str(tmp_path / "cache"))
+        rules = tmp_path / "rules.txt"
+        rules.write_text("Untertitel von \\w+\n", encoding="utf-8")
+        cleaner = Cleaner(options={"rules": [rules], "line_length": 5})
+        # rules are loaded once, when the cleaner is built
+        monkeypatch.setattr("subclean.processors.processor.load_rules", None)
+        text = (
+            "1\n00:00:01,000 --> 00:00:02,000\nUntertitel von Max\n\n"
+            "2\n00:00:03,000 --> 00:00:04,000\nShort\nlines\n"
+        )
+        expected = "1\n00:00:03,000 --> 00:00:04,000\nShort\nlines\n\n"
+        assert cleaner.clean_text(text) == expected
+        with ThreadPoolExecutor(4) as pool:
+            assert set(pool.map(cleaner.clean_text, [text] * 20)) == {expected}
+        subtitles = [SrtSubtitle.from_string(text) for _ in range(3)]
+        cleaned = list(cleaner.clean_many(subtitles))
+        assert cleaned == subtitles
+        assert all(subtitle.dumps() == expected for subtitle in cleaned)
+
+    def test_options(self):
+        text = "1\n00:00:01,000 --> 00:00:02,000\n<i></i>Short\nlines\n"
+        assert clean_text(text, options={"line_length": 5}) == (
+            "1\n00:00:01,000 --> 00:00:02,000\nShort\nlines\n\n"
+        )
+        assert clean_text(text, [Processors.Style], {"shift": 1000}) == (
+            "1\n00:00:02,000 --> 00:00:03,000\nShort\nlines\n\n"
+        )
+        assert clean_text(text, [StyleProcessor]) == clean_text(
+            text, [Processors.Style]
+        )
+        with pytest.raises(TypeError):
+            clean_text(text, options={"unknown": 1})
@@ -0,0 +1,112 @@
+import json
+import shutil
+import time
+from argparse import Namespace
+from pathlib import Path
+
+import pytest
+
+from subclean.batch import clean_files, dispatch_async, find_subtitles
+from subclean.manifest import Manifest
+from subclean.processors.processor import DEFAULT_PROCESSORS
+from subclean.subclean import main
+
+PROCESSORS = [processor.value for processor in DEFAULT_PROCESSORS]
+ARGS = Namespace(
+    file=None,
+    overwrite=False,
+    output=None,
+    regex=None,
+    line_length=None,
+    log_level="INFO",
+)
+
+
+class TestBatch:
+    @pytest.fixture()
+    def library(self, tmp_path: Path) -> Path:
+        for input_path in Path("tests/subs").glob("*.input.srt"):
+            show = tmp_path / input_path.name.split(".")[0]
+            show.mkdir()
+            shutil.copy(input_path, show / input_path.name)
+        return tmp_path
+
+    def test_find_subtitles(self, library: Path):
+        (library / "notes.txt").touch()
+        (library / "1883" / "1883.S01E03.input_clean.srt").touch()
+        paths = list(find_subtitles(library))
+        assert len(paths) == 5
+        assert all(path.suffix == ".srt" for path in paths)
+        assert not any(path.stem.endswith("_clean") for path in paths)
+
+    @pytest.mark.parametrize(
+        "options",
+        [
+            ["--jobs", "2"],
+            ["--async"],
+            ["--async", "--jobs", "2", "--in-flight", "2"],
+        ],
+    )
+    def test_recursive_jobs(self, library: Path, options: list[str]):
+        main(["--recursive", str(library), *options])
+        for input_path in library.rglob("*.input.srt"):
+            result_path = input_path.with_stem(input_path.stem + "_clean")
+            ref_path = Path("tests/subs") / input_path.name.replace(
+                ".input.srt", ".ref.srt"
+            )
+            assert list(open(result_path)) == list(open(ref_path))
+
+    @pytest.mark.parametrize("options", [[], ["--async"]])
+    def test_piped_jobs(self, library: Path, capfd, options: list[str]):
+        # worker processes log to stderr as well, keeping stdout parseable
+        args = ["--recursive", str(library), "--jobs", "2", *options]
+        main([*args, "--dry-run", "--diff"])
+        out, err = capfd.readouterr()
+        assert out.startswith("--- ")
+        assert "| INFO" not in out
+        assert "Importing subtitle" in err
+        main([*args, "--stats-json", "-"])
+        out, err = capfd.readouterr()
+        assert len(json.loads(out)["files"]) == 5
+        assert "Saving subtitle" in err
+
+    def test_async_stream(self, library: Path):
+        with pytest.raises(SystemExit) as e:
+            main(["--recursive", str(library), "--async", "--stream"])
+        assert e.value.code == 2
+
+    @pytest.mark.parametrize("options", [[], ["--async"]])
+    def test_failed_file(self, tmp_path: Path, options: list[str]):
+        (tmp_path / "broken.srt").write_text("some text before any timing\n")
+        with pytest.raises(SystemExit) as e:
+            main(["--recursive", str(tmp_path), *options])
+        assert e.value.code == 1
+
+    def test_async_in_flight(self, library: Path, monkeypatch):
+        reading = peak = 0
+        read_bytes = Path.read_bytes
+
+        def tracked(path: Path) -> bytes:
+            nonlocal reading, peak
+            reading += 1
+            peak = max(peak, reading)
+            time.sleep(0.05)
+            reading -= 1
+            return read_bytes(path)
+
+        monkeypatch.setattr(Path, "read_bytes", tracked)
+        paths = list(find_subtitles(library))
+        results = list(dispatch_async(paths, PROCESSORS, ARGS, in_flight=2))
+        assert sorted(result.path for result in results) == paths
+        assert all(result.ok for result in results)
+        assert peak == 2
+
+    def test_manifest(self, library: Path):
+        manifest_path = library / "manifest.json"
+        paths = list(find_subtitles(library))
+        manifest = Manifest(manifest_path)
+        results = list(clean_files(paths, PROCESSORS, ARGS, 2, manifest))
+        assert not any(result.skipped for result in results)
+        paths[0].write_text(paths[0].read_text() + "\n")
+        results = list(clean_files(paths, PROCESSORS, ARGS, 2, manifest))
+        assert [result.path for result in results if not result.skipped] == paths[:1]
@@ -0,0 +1,57 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from subclean.bench import bench, generate_corpus, slowest_imports, startup
+from subclean.core.parser import SubtitleParser
+from subclean.processors.processor import Processors
+from subclean.subclean import main
+
+
+class TestBench:
+    def test_generate_corpus(self, tmp_path: Path):
+        path = tmp_path / "corpus.srt"
+        path.write_text(generate_corpus(200), encoding="utf-8")
+        subtitle = SubtitleParser.load(path)
+        assert len(subtitle.sections) == 200
+        assert generate_corpus(200) == generate_corpus(200)
+        assert generate_corpus(200) != generate_corpus(200, seed=1)
+
+    def test_bench(self):
+        results = bench([50], repeat=1)
+        names = [result.name for result in results]
+        assert names[0] == "SubtitleParser.load"
+        assert all(processor.value.__name__ in names for processor in Processors)
+        assert all(result.sections == 50 for result in results)
+        assert all(result.throughput > 0 for result in results)
+
+    def test_subcommand(self, capsys):
+        main(["bench", "--sizes", "20", "--repeat", "1", "--json"])
+        results = json.loads(capsys.readouterr().out)
+        assert results[-1]["name"] == "SrtSubtitle.save"
+
+    def test_startup(self, tmp_path: Path):
+        path = tmp_path / "startup.srt"
+        path.write_text(generate_corpus(20), encoding="utf-8")
+        results = startup(path, repeat=1)
+        assert list(results) == [
+            "python",
+            "import subclean",
+            "subclean --version",
+            "subclean FILE",
+        ]
+        assert path.with_stem("startup_clean").exists()
+        imports = dict(slowest_imports("--version", count=100))
+        assert "subclean.subclean" in imports
+
+    def test_lazy_imports(self):
+        code = (
+            "import sys, subclean, subclean.cli; "
+            "print(' '.join(m for m in ('loguru', 'importlib.metadata', "
+            "'subclean.processors.processor') if m in sys.modules))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout
+        assert output.strip() == ""
@@ -1,9 +1,16 @@
+from argparse import Namespace
 from pathlib import Path
 from unittest.mock import MagicMock
 
 import pytest
 
+from subclean.blacklist import blacklist
 from subclean.core.line import Line
+from subclean.core.matcher import (
+    BlacklistMatcher,
+    LiteralAutomaton,
+    required_literals,
+)
 from subclean.core.parser import SubtitleParser
 from subclean.processors.processor import BlacklistProcessor
 
@@ -35,3 +42,67 @@ class TestBlacklistProcessor:
         assert len(sub_processor.subtitle.sections) == 3
         output_subtitle = sub_processor.process()
         assert len(output_subtitle.sections) == 0
+
+    def test_matcher_reports_rule(self, fake_processor: BlacklistProcessor):
+        assert (
+            fake_processor.matcher.match(Line("Sync and corrected by foo"))
+            == r"\b((sub(title)?s?|sync(e|')?d?|cleaned|corrected|rip(ped)?|improved|encod|resync|edit|caption|version|provided)(ed|ing)?\b\s((&|and|,)\s)?)+(by|for|at)\b"
+        )
+        assert fake_processor.matcher.match(Line("WARNER BROS")) == (
+            r"\b(WARNER BROS|Media Access Group|WGBH)\b"
+        )
+        assert fake_processor.matcher.match(Line("Just a regular line.")) is None
+
+    def test_custom_regex(self):
+        subtitle = MagicMock()
+        processor = BlacklistProcessor(subtitle, cli_args=Namespace(regex=r"\bfoo\b"))
+        assert processor.in_blacklist(Line("Foo bar"))
+        assert not BlacklistProcessor(subtitle).in_blacklist(Line("Foo bar"))
+
+    def test_matcher_backreference(self):
+        matcher = BlacklistMatcher([*blacklist, r"(\w+) \1"])
+        assert matcher.combined is None
+        assert matcher.match(Line("bye bye")) == r"(\w+) \1"
+        assert (
+            matcher.match(Line("www.example.com"))
+            == r"www\.|https?:\/\/|\.(org|link|com)"
+        )
+
+    @pytest.mark.parametrize(
+        "pattern,literals",
+        [
+            (r"Addic7ed|Subscene", {"addic7ed", "subscene"}),
+            (r"\b(WARNER BROS|Media)\b", {"warner bros", "media"}),
+            (r"www\.|https?:\/\/|\.(org|com)", {"www.", "http", "org", "com"}),
+            (r"Übersetzung:", {"übersetzung:"}),
+            (r"^\*|\*$", {"*"}),
+            (r"^[-_]+$", {"-", "_"}),
+            (r"^[a-z]+$", None),
+            (r"foo|\d+", None),
+        ],
+    )
+    def test_required_literals(self, pattern: str, literals):
+        assert required_literals(pattern) == literals
+
+    def test_literal_automaton(self):
+        automaton = LiteralAutomaton({"he": [0], "she": [1], "hers": [2], "x": [0]})
+        assert automaton.search("ushers") == {0, 1, 2}
+        assert automaton.search("shx") == {0}
+        assert automaton.search("hhe") == {0}
+        assert automaton.search("nothing") == set()
+
+    def test_matcher_prefilter(self):
+        matcher = BlacklistMatcher(blacklist)
+        assert matcher.automaton is not None
+        assert matcher.fallback == []
+        assert (
+            matcher.match(Line("SUBSCENE")) == r"Addic7ed|Subscene|Podnapisi|Subtitles"
+        )
+        # case insensitive matches the literal scan must not miss
+        assert matcher.match(Line("ſubscene")) is not None
+        assert matcher.match(Line("ADDİC7ED")) is not None
+        matcher = BlacklistMatcher([r"^[a-z]+$", r"\bfoo\b"])
+        assert matcher.fallback == [0]
+        assert matcher.match(Line("foobar")) == r"^[a-z]+$"
+        assert matcher.match(Line("a foo.")) == r"\bfoo\b"
+        assert matcher.match(Line("a food.")) is None
@@ -0,0 +1,55 @@
+import dataclasses
+from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from subclean import clean_text
+from subclean.blacklist import blacklist
+from subclean.config import CleanConfig
+from subclean.core.line import Line
+from subclean.processors.processor import BlacklistProcessor, LineLengthProcessor
+
+TEXT = "1\n00:00:01,000 --> 00:00:02,000\nShort\nlines\n"
+
+
+class TestCleanConfig:
+    def test_from_args(self):
+        args = Namespace(regex="foo", rules=["de.txt"], line_length=20, fps=[1, 2])
+        config = CleanConfig.from_args(args)
+        assert config == CleanConfig(
+            regex=("foo",), rules=(Path("de.txt"),), line_length=20, fps=(1, 2)
+        )
+        assert CleanConfig.from_args(config) is config
+        assert CleanConfig.from_args(None) == CleanConfig()
+        hash(config)
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            config.line_length = 30  # type: ignore[misc]
+
+    def test_processors(self):
+        config = CleanConfig(regex=("foo",), line_length=5)
+        processor = BlacklistProcessor(None, config=config)
+        assert processor.in_blacklist(Line("foo"))
+        assert not BlacklistProcessor(None).in_blacklist(Line("foo"))
+        assert "foo" not in blacklist
+        assert LineLengthProcessor(None, config=config).line_length == 5
+        assert LineLengthProcessor(None).line_length == 50
+        # parsed arguments are still accepted
+        processor = LineLengthProcessor(None, cli_args=Namespace(line_length=7))
+        assert processor.line_length == 7
+
+    def test_threads(self):
+        short = CleanConfig(line_length=5)
+        long = CleanConfig(line_length=50)
+        with ThreadPoolExecutor(4) as pool:
+            results = list(
+                pool.map(
+                    lambda config: clean_text(TEXT, options=config),
+                    [short, long] * 20,
+                )
+            )
+        assert set(results[::2]) == {clean_text(TEXT, options=short)}
+        assert set(results[1::2]) == {
+            "1\n00:00:01,000 --> 00:00:02,000\nShort lines\n\n"
+        }
@@ -0,0 +1,60 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from subclean.diff import section_diff
+from subclean.subclean import main
+
+
+class TestDiff:
+    def test_section_diff(self):
+        before = ["00:00:01,000 --> 00:00:02,000\n[door opens]", "t2\nHello", "t3\nBye"]
+        after = ["t2\nHello", "t3\nBye!"]
+        assert section_diff(before, after, Path("a.srt")).splitlines() == [
+            "--- a.srt",
+            "+++ a.srt",
+            "@@ -1,6 +1,4 @@ sections -1,3 +1,2",
+            "-00:00:01,000 --> 00:00:02,000",
+            "-[door opens]",
+            " t2",
+            " Hello",
+            "-t3",
+            "-Bye",
+            "+t3",
+            "+Bye!",
+        ]
+        assert section_diff(after, after, Path("a.srt")) == ""
+
+    def test_hunk_ranges(self, tmp_path: Path):
+        # patch relies on the counts in the hunk header
+        before = [f"t{i}\nline {i}" for i in range(10)]
+        after = before[:3] + before[4:8] + ["t8\nline 8!", "t9\nline 9"]
+        diff = section_diff(before, after, Path("a.txt"))
+        assert "@@ -5,6 +5,4 @@ sections -3,3 +3,2\n" in diff
+        assert "@@ -15,6 +13,6 @@ sections -8,3 +7,3\n" in diff
+        if shutil.which("patch") is None:
+            pytest.skip("patch is not installed")
+        path = tmp_path / "a.txt"
+        path.write_text("".join(f"{section}\n" for section in before))
+        patch = tmp_path / "a.diff"
+        patch.write_text(diff)
+        subprocess.run(["patch", "-s", str(path), str(patch)], check=True)
+        assert path.read_text() == "".join(f"{section}\n" for section in after)
+
+    def test_dry_run(self, tmp_path: Path, capsys):
+        input_path = Path("tests/subs/1883.S01E03.input.srt")
+        path = tmp_path / input_path.name
+        shutil.copy(input_path, path)
+        main([str(path), "--dry-run", "--diff"])
+        out = capsys.readouterr().out
+        assert out.startswith(f"--- {path}\n+++ {path}\n@@ ")
+        assert "\n-[indistinct chatter]\n" in out
+        assert "\n+- Hey, don't push from there, get to the back!\n" in out
+        assert list(tmp_path.iterdir()) == [path]
+        assert path.read_text() == input_path.read_text()
+
+    def test_stream(self):
+        with pytest.raises(SystemExit):
+            main(["tests/subs/1883.S01E03.input.srt", "--dry-run", "--stream"])
@@ -1,16 +1,28 @@
 from pathlib import Path
 
+import pytest
+
 from subclean.subclean import main
 
 
 class TestIntegration:
-    def test_integration(self):
+    @pytest.mark.parametrize("options", [[], ["--stream"]])
+    def test_integration(self, options: list[str]):
         for input_path in Path("tests/subs").glob("*.input.srt"):
             ref_path = input_path.with_suffix("").with_suffix(".ref.srt")
             result_path = input_path.with_stem(input_path.stem + "_clean")
             try:
                 # run subclean
-                main([str(input_path)])
+                main([str(input_path), *options])
                 assert list(open(result_path)) == list(open(ref_path))
             finally:
                 result_path.unlink()
+
+    def test_stream_keep_encoding(self, tmp_path: Path):
+        path = tmp_path / "sub.srt"
+        path.write_bytes(
+            "1\n00:00:01,000 --> 00:00:02,000\n# la la café\n".encode("cp1252")
+        )
+        main([str(path), "--stream", "--keep-encoding", "--overwrite"])
+        # the music note added isn't in cp1252, so the output is UTF-8
+        assert "♪" in path.read_text(encoding="utf-8")
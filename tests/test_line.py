@@ -29,3 +29,15 @@ class TestLine:
         assert Line("- <i>This is a dialog.</i>").is_dialog()
         assert Line("-this is also a dialog").is_dialog()
         assert not Line("not a dialog").is_dialog()
+
+    def test_visible(self):
+        line = Line("- <i>It's working.</i>")
+        assert line.visible == "- It's working."
+        assert line.visible is line.visible
+        assert not hasattr(line, "__dict__")
+
+    def test_sub(self):
+        line = Line("<i>unchanged</i>")
+        assert line.sub(r"foo", "bar") is line
+        assert line.sub(r"unchanged", "changed") == "<i>changed</i>"
+        assert line.sub(r"unchanged", "changed").visible == "changed"
@@ -4,6 +4,7 @@ import pytest
 
 from subclean.core.line import Line
 from subclean.core.parser import SubtitleParser
+from subclean.core.section import Section
 from subclean.core.subtitle import Subtitle
 from subclean.processors.processor import LineLengthProcessor
 
@@ -57,6 +58,17 @@ class TestLineLengthProcessor:
             [Line("-I'm gonna call the police,"), Line("this can't keep happening.")]
         ) == [[Line("-I'm gonna call the police,"), Line("this can't keep happening.")]]
 
+    def test_dialog_chunks(self, processor: LineLengthProcessor):
+        lines = [Line("hi"), Line("<i>- bob</i>"), Line("- bye"), Line("bob")]
+        assert list(processor.dialog_chunks(lines)) == [(0, 1), (1, 2), (2, 4)]
+        assert list(processor.dialog_chunks([])) == []
+        # merged length counts the lines without style tags
+        assert processor.fits([Line("<i>" + "a" * 24 + "</i>"), Line("a" * 24)], 0, 2)
+        assert not processor.fits([Line("a" * 25), Line("a" * 24)], 0, 2)
+        section = Section(None, [Line("- " + "a" * 40), Line("- " + "b" * 40)])
+        lines = section.lines
+        assert processor.process_section(section).lines is lines
+
     def test_merge_short_lines(self, processor: LineLengthProcessor):
         sections = processor.subtitle.sections
         section = processor.process_section(sections[0])
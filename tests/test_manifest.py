@@ -0,0 +1,64 @@
+import shutil
+from argparse import Namespace
+from pathlib import Path
+
+import pytest
+
+from subclean.manifest import Manifest
+from subclean.processors.processor import DEFAULT_PROCESSORS
+from subclean.subclean import main, subclean
+
+PROCESSORS = [processor.value for processor in DEFAULT_PROCESSORS]
+
+
+class TestManifest:
+    @pytest.fixture()
+    def input_path(self, tmp_path: Path) -> Path:
+        path = tmp_path / "sub.srt"
+        shutil.copy("tests/resources/sub_sdh.srt", path)
+        return path
+
+    @pytest.fixture()
+    def args(self) -> Namespace:
+        return Namespace(overwrite=False, output=None, regex=None, line_length=None)
+
+    def test_fingerprint(self, args: Namespace):
+        fingerprint = Manifest.fingerprint(PROCESSORS, args)
+        assert fingerprint == Manifest.fingerprint(PROCESSORS, args)
+        assert fingerprint != Manifest.fingerprint(PROCESSORS[:-1], args)
+        args.line_length = 42
+        assert fingerprint != Manifest.fingerprint(PROCESSORS, args)
+
+    def test_skip_unchanged(self, tmp_path: Path, input_path: Path, args: Namespace):
+        manifest = Manifest(tmp_path / "manifest.json")
+        assert not subclean(input_path, PROCESSORS, args, manifest).skipped
+        assert subclean(input_path, PROCESSORS, args, manifest).skipped
+        # configuration changed
+        args.line_length = 42
+        assert not subclean(input_path, PROCESSORS, args, manifest).skipped
+        # input changed
+        input_path.write_text(input_path.read_text() + "\n")
+        assert not subclean(input_path, PROCESSORS, args, manifest).skipped
+        # output removed
+        input_path.with_stem("sub_clean").unlink()
+        assert not subclean(input_path, PROCESSORS, args, manifest).skipped
+
+    def test_output_changed(self, tmp_path: Path, input_path: Path, args: Namespace):
+        manifest = Manifest(tmp_path / "manifest.json")
+        assert not subclean(input_path, PROCESSORS, args, manifest).skipped
+        args.overwrite = True
+        assert not subclean(input_path, PROCESSORS, args, manifest).skipped
+        assert subclean(input_path, PROCESSORS, args, manifest).skipped
+        args.overwrite = False
+        args.output = str(tmp_path / "other.srt")
+        assert not subclean(input_path, PROCESSORS, args, manifest).skipped
+        args.output = str(tmp_path / "another.srt")
+        assert not subclean(input_path, PROCESSORS, args, manifest).skipped
+
+    def test_persisted(self, tmp_path: Path, input_path: Path, args: Namespace):
+        manifest_path = tmp_path / "manifest.json"
+        main([str(input_path), "--overwrite", "--manifest", str(manifest_path)])
+        assert manifest_path.exists()
+        manifest = Manifest(manifest_path)
+        args.overwrite = True
+        assert subclean(input_path, PROCESSORS, args, manifest).skipped
@@ -0,0 +1,42 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from subclean.core.parser import SubtitleParser
+from subclean.processors.pipeline import Pipeline
+from subclean.processors.processor import DEFAULT_PROCESSORS, Processor, Processors
+
+SUBTITLES = [
+    *sorted(Path("tests/subs").glob("*.input.srt")),
+    *sorted(Path("tests/resources").glob("*.srt")),
+]
+rng = random.Random(0)
+ORDERS = [
+    [processor.value for processor in DEFAULT_PROCESSORS],
+    [processor.value for processor in reversed(DEFAULT_PROCESSORS)],
+    *(rng.sample([processor.value for processor in Processors], 6) for _ in range(2)),
+]
+
+
+class TestPipeline:
+    def test_fuse(self):
+        subtitle = SubtitleParser.load(Path("tests/resources/sub_error.srt"))
+        pipeline = Pipeline(
+            subtitle, [processor.value for processor in DEFAULT_PROCESSORS]
+        )
+        # Dialog and Error only apply line operations
+        assert len(pipeline.stages) == 5
+        assert type(pipeline.stages[2]) is Processor
+        assert pipeline.stages[2].operations == (
+            pipeline.processors[2].operations + pipeline.processors[3].operations
+        )
+
+    @pytest.mark.parametrize("path", SUBTITLES, ids=lambda path: path.name)
+    @pytest.mark.parametrize("processors", ORDERS)
+    def test_equivalent(self, path: Path, processors: list[type[Processor]]):
+        sequential = SubtitleParser.load(path)
+        for processor in processors:
+            sequential = processor(sequential).process()
+        fused = Pipeline(SubtitleParser.load(path), processors).process()
+        assert [str(s) for s in fused.sections] == [str(s) for s in sequential.sections]
@@ -0,0 +1,111 @@
+from argparse import Namespace
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from subclean.core.line import Line
+from subclean.processors.processor import BlacklistProcessor
+from subclean.rules import RuleError, cache_path, load_pack, load_rules
+from subclean.subclean import main
+
+RULES = """# ads of a fansub group
+Untertitel von \\w+
+\\bSubGruppe\\b
+
+SubGruppe
+"""
+
+
+class TestRules:
+    @pytest.fixture(autouse=True)
+    def cache(self, tmp_path: Path, monkeypatch) -> Iterator[Path]:
+        monkeypatch.setenv("SUBCLEAN_CACHE_DIR", str(tmp_path / "cache"))
+        load_pack.cache_clear()
+        yield tmp_path / "cache"
+        load_pack.cache_clear()
+
+    def test_text(self, tmp_path: Path):
+        path = tmp_path / "de.txt"
+        path.write_text(RULES, encoding="utf-8")
+        pack = load_rules(path)
+        assert pack.patterns == (r"Untertitel von \w+", r"\bSubGruppe\b", "SubGruppe")
+        assert pack.literals[0] == {"untertitel von "}
+
+    @pytest.mark.parametrize(
+        "name,content",
+        [
+            ("de.toml", "rules = ['Untertitel von \\w+', 'SubGruppe']\n"),
+            ("de.yaml", "rules:\n  - 'Untertitel von \\w+'\n  - SubGruppe\n"),
+        ],
+    )
+    def test_structured(self, tmp_path: Path, name: str, content: str):
+        path = tmp_path / name
+        path.write_text(content, encoding="utf-8")
+        assert load_rules(path).patterns == (r"Untertitel von \w+", "SubGruppe")
+
+    def test_invalid(self, tmp_path: Path):
+        path = tmp_path / "broken.txt"
+        path.write_text("fine\n(unbalanced\n", encoding="utf-8")
+        with pytest.raises(RuleError, match="broken.txt:2"):
+            load_rules(path)
+        path = tmp_path / "broken.toml"
+        path.write_text("rules = 'not a list'\n", encoding="utf-8")
+        with pytest.raises(RuleError, match="expected a list"):
+            load_rules(path)
+        with pytest.raises(RuleError, match="Unable to read"):
+            load_rules(tmp_path / "missing.txt")
+
+    def test_cache(self, tmp_path: Path, cache: Path, monkeypatch):
+        path = tmp_path / "de.txt"
+        path.write_text(RULES, encoding="utf-8")
+        pack = load_rules(path)
+        assert cache_path(pack.digest, "text").exists()
+        load_pack.cache_clear()
+        # validated rules are read back without parsing them again
+        monkeypatch.setattr("subclean.rules.validate", None)
+        assert load_rules(path) == pack
+
+    def test_cache_format(self, tmp_path: Path, cache: Path):
+        # the same bytes are one rule per line as text, but a list under
+        # "rules" as TOML, so they are cached separately
+        data = "rules = ['SubGruppe']\n"
+        (tmp_path / "de.txt").write_text(data, encoding="utf-8")
+        (tmp_path / "de.toml").write_text(data, encoding="utf-8")
+        assert load_rules(tmp_path / "de.txt").patterns == ("rules = ['SubGruppe']",)
+        load_pack.cache_clear()
+        assert load_rules(tmp_path / "de.toml").patterns == ("SubGruppe",)
+
+    def test_processor(self, tmp_path: Path):
+        path = tmp_path / "de.txt"
+        path.write_text(RULES, encoding="utf-8")
+        processor = BlacklistProcessor(None, cli_args=_args(rules=[path]))
+        assert processor.in_blacklist(Line("Untertitel von Max"))
+        assert processor.in_blacklist(Line("Subscene"))
+        assert not BlacklistProcessor(None).in_blacklist(Line("Untertitel von Max"))
+
+    def test_regex_repeated(self):
+        processor = BlacklistProcessor(None, cli_args=_args(regex=["foo", "bar"]))
+        assert processor.in_blacklist(Line("foo"))
+        assert processor.in_blacklist(Line("bar"))
+
+    def test_cli(self, tmp_path: Path):
+        subtitle = tmp_path / "sub.srt"
+        subtitle.write_text(
+            "1\n00:00:01,000 --> 00:00:02,000\nUntertitel von Max\n\n"
+            "2\n00:00:03,000 --> 00:00:04,000\nHallo\n",
+            encoding="utf-8",
+        )
+        rules = tmp_path / "de.txt"
+        rules.write_text(RULES, encoding="utf-8")
+        main([str(subtitle), "--rules", str(rules), "--overwrite"])
+        assert "Untertitel" not in subtitle.read_text()
+        rules.write_text("(\n", encoding="utf-8")
+        with pytest.raises(SystemExit):
+            main([str(subtitle), "--rules", str(rules)])
+        with pytest.raises(SystemExit):
+            main([str(subtitle), "--regex", "("])
+
+
+def _args(**kwargs) -> Namespace:
+    return Namespace(**{"rules": None, "regex": None, **kwargs})
@@ -155,3 +155,37 @@ class TestSDHProcessor:
             "I got some time",
             "between 4:00 and 6:00.",
         ]
+
+    def test_classify(self, fake_processor: SDHProcessor):
+        assert fake_processor.classify(Line("[camera shutter]")) == (
+            "is_parentheses",
+            "",
+        )
+        assert fake_processor.classify(Line("♪")) == ("is_simple_hi", "")
+        assert fake_processor.classify(Line("(distant shouting,")) == (
+            "is_parenthesis_not_matching",
+            "",
+        )
+        assert fake_processor.classify(Line("- CHRISTOPHER:<i> Hello?</i>")) == (
+            "contains_hi",
+            "- <i>Hello?</i>",
+        )
+        line = Line("between 4:00 and 6:00.")
+        assert fake_processor.classify(line) == (None, line)
+        assert fake_processor.classify(line)[1] is line
+
+    def test_classify_equivalent(self, fake_processor: SDHProcessor):
+        for path in Path("tests/subs").glob("*.input.srt"):
+            for section in SubtitleParser.load(path).sections:
+                for line in section.lines:
+                    rule, cleaned = fake_processor.classify(line)
+                    hi = fake_processor.is_hi(
+                        line
+                    ) or fake_processor.is_parenthesis_not_matching(line)
+                    assert (rule is not None and rule != "contains_hi") == hi
+                    if not hi:
+                        assert (rule == "contains_hi") == fake_processor.contains_hi(
+                            line
+                        )
+                        if rule == "contains_hi":
+                            assert cleaned == fake_processor.clean_hi(line)
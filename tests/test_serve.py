@@ -0,0 +1,86 @@
+import io
+import json
+import shutil
+import socket
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from subclean.core.matcher import compile_blacklist
+from subclean.serve import Worker, parse_args, serve_socket
+from subclean.subclean import main
+
+TEXT = "1\n00:00:01,000 --> 00:00:02,000\n[DOOR OPENS] JOHN: Hello\n"
+
+
+@pytest.fixture(scope="module")
+def worker() -> Worker:
+    return Worker(parse_args([]))
+
+
+class TestServe:
+    def test_file(self, worker: Worker, tmp_path: Path):
+        input_path = Path("tests/subs/1883.S01E03.input.srt")
+        path = tmp_path / input_path.name
+        shutil.copy(input_path, path)
+        request = {"id": 7, "file": str(path), "options": {"overwrite": True}}
+        response = json.loads(worker.handle_line(json.dumps(request)))
+        assert response["id"] == 7
+        assert response["ok"]
+        assert response["output"] == str(path)
+        assert response["lines_removed"] > 0
+        assert path.read_text() == Path("tests/subs/1883.S01E03.ref.srt").read_text()
+
+    def test_text(self, worker: Worker):
+        response = worker.handle({"text": TEXT, "processors": ["SDH"]})
+        assert response == {
+            "ok": True,
+            "text": "1\n00:00:01,000 --> 00:00:02,000\nHello\n\n",
+        }
+
+    def test_errors(self, worker: Worker):
+        assert not json.loads(worker.handle_line("nope"))["ok"]
+        assert not json.loads(worker.handle_line("[]"))["ok"]
+        assert not worker.handle({"id": 1})["ok"]
+        assert not worker.handle({"text": TEXT, "processors": ["Unknown"]})["ok"]
+        assert not worker.handle({"text": TEXT, "options": {"unknown": 1}})["ok"]
+        response = worker.handle({"id": 2, "file": "missing.srt"})
+        assert response["id"] == 2
+        assert "FileNotFoundError" in response["error"]
+
+    def test_bounded(self, worker: Worker, monkeypatch):
+        # options are resolved from the worker's defaults, not a new parser
+        monkeypatch.setattr("subclean.api.build_parser", None)
+        for i in range(40):
+            response = worker.handle({"text": TEXT, "options": {"regex": [f"x{i}"]}})
+            assert response["ok"]
+        assert worker.cleaner.cache_info().currsize <= 16
+        assert compile_blacklist.cache_info().currsize <= 32
+
+    def test_stdin(self, monkeypatch, capsys):
+        requests = [{"id": i, "text": TEXT} for i in range(3)]
+        stdin = "\n".join(json.dumps(request) for request in requests) + "\n\n"
+        monkeypatch.setattr("sys.stdin", io.StringIO(stdin))
+        main(["serve", "--line-length", "20"])
+        responses = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [response["id"] for response in responses] == [0, 1, 2]
+        assert all(response["ok"] for response in responses)
+
+    def test_socket(self, worker: Worker, tmp_path: Path):
+        path = tmp_path / "subclean.sock"
+        threading.Thread(target=serve_socket, args=(worker, path), daemon=True).start()
+        while not path.exists():
+            time.sleep(0.01)
+        with socket.socket(socket.AF_UNIX) as client:
+            client.connect(str(path))
+            f = client.makefile("rwb")
+            for i in range(2):
+                f.write(json.dumps({"id": i, "text": TEXT}).encode() + b"\n")
+                f.flush()
+                assert json.loads(f.readline())["id"] == i
+
+    def test_parse_args(self):
+        with pytest.raises(SystemExit):
+            parse_args(["--output", "out.srt"])
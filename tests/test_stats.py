@@ -0,0 +1,61 @@
+import json
+from pathlib import Path
+
+from subclean.core.parser import SubtitleParser
+from subclean.core.result import ProcessorStats
+from subclean.processors.pipeline import Pipeline
+from subclean.processors.processor import DEFAULT_PROCESSORS
+from subclean.stats import format_table
+from subclean.subclean import main
+
+PROCESSORS = [processor.value for processor in DEFAULT_PROCESSORS]
+
+
+class TestStats:
+    def test_pipeline_stats(self):
+        subtitle = SubtitleParser.load(Path("tests/resources/sub_sdh.srt"))
+        pipeline = Pipeline(subtitle, PROCESSORS, stats=True)
+        assert pipeline.stages == pipeline.processors
+        pipeline.process()
+        stats = {s.name: s for s in pipeline.collect_stats()}
+        sdh = stats["SDHProcessor"]
+        assert (sdh.sections_in, sdh.sections_out) == (4, 2)
+        assert sdh.lines_removed > 0
+        assert sdh.rules
+        # output of one processor is input of the next
+        for a, b in zip(pipeline.collect_stats(), pipeline.collect_stats()[1:]):
+            assert (a.sections_out, a.lines_out) == (b.sections_in, b.lines_in)
+
+    def test_no_stats(self):
+        subtitle = SubtitleParser.load(Path("tests/resources/sub_sdh.srt"))
+        assert Pipeline(subtitle, PROCESSORS).collect_stats() == []
+
+    def test_merge(self):
+        a = ProcessorStats("A", seconds=1.0, lines_in=3, lines_out=2)
+        a.rules["x"] += 1
+        b = ProcessorStats("A", seconds=0.5, lines_in=2, lines_out=2)
+        b.rules["x"] += 2
+        a.merge(b)
+        assert (a.seconds, a.lines_removed, a.rules["x"]) == (1.5, 1, 3)
+        assert "1x" not in format_table([a]) and "3x x" in format_table([a])
+
+    def test_stats_json(self, tmp_path: Path):
+        input_path = Path("tests/resources/sub_ads.srt")
+        stats_path = tmp_path / "stats.json"
+        output_path = tmp_path / "out.srt"
+        main([str(input_path), "-o", str(output_path), "--stats-json", str(stats_path)])
+        data = json.loads(stats_path.read_text())
+        assert data["files"][0]["path"] == str(input_path)
+        blacklist = data["total"][0]
+        assert blacklist["name"] == "BlacklistProcessor"
+        assert blacklist["lines_removed"] == 6
+        assert sum(blacklist["rules"].values()) == 6
+
+    def test_stats_json_stdout(self, tmp_path: Path, capsys):
+        input_path = Path("tests/resources/sub_ads.srt")
+        output_path = tmp_path / "out.srt"
+        main([str(input_path), "-o", str(output_path), "--stats-json", "-"])
+        captured = capsys.readouterr()
+        data = json.loads(captured.out)
+        assert data["total"][0]["lines_removed"] == 6
+        assert "Saving subtitle" in captured.err
@@ -1,9 +1,20 @@
+import codecs
+import io
+import os
 from pathlib import Path
 
 import pytest
 
+from subclean.core.line import Line
 from subclean.core.parser import SubtitleParser
-from subclean.core.subtitle import SrtSubtitle, Subtitle
+from subclean.core.subtitle import (
+    AssSubtitle,
+    Encoding,
+    SrtSubtitle,
+    Subtitle,
+    SubtitleFormat,
+    VttSubtitle,
+)
 
 
 class TestSubtitleParser:
@@ -14,6 +25,15 @@ class TestSubtitleParser:
 
     def test_handler(self, subtitle: Subtitle):
         assert isinstance(subtitle, SrtSubtitle)
+        # the decoded file isn't kept once it's parsed
+        assert not hasattr(subtitle, "text")
+
+    def test_read_once(self, monkeypatch):
+        # the format is detected from the content read for parsing
+        monkeypatch.setattr("builtins.open", None)
+        subtitle = SubtitleParser.load(Path("tests/resources/sub.vtt"))
+        assert isinstance(subtitle, VttSubtitle)
+        assert subtitle.filepath == Path("tests/resources/sub.vtt")
 
     def test_srtparser(self, subtitle: SrtSubtitle):
         assert len(subtitle.sections) == 667
@@ -24,3 +44,241 @@ class TestSubtitleParser:
         assert subtitle.sections[13].timing.start_time == "00:01:29,605"
         assert subtitle.sections[13].timing.end_time == "00:01:31,645"
         assert "Translated by" in subtitle.sections[-1].content()
+
+    def test_srt_timing(self):
+        text = (
+            "1\n00:00:01:000 --> 00:00:02,0000 X1:100 X2:600 Y1:10 Y2:50\nHello\n\n"
+            "2\n00:00:03 --> 00:00:04.5\nWorld\n\n"
+        )
+        subtitle = SrtSubtitle.from_string(text)
+        assert subtitle.dumps() == (
+            "1\n00:00:01,000 --> 00:00:02,000 X1:100 X2:600 Y1:10 Y2:50\nHello\n\n"
+            "2\n00:00:03,000 --> 00:00:04,500\nWorld\n\n"
+        )
+
+    @pytest.mark.parametrize(
+        "encoding,expected",
+        [
+            ("utf-8", Encoding.UTF_8),
+            ("utf-8-sig", Encoding.UTF_8_SIG),
+            ("utf-16", Encoding.UTF_16),
+            ("utf-16-le", Encoding.UTF_16_LE),
+            ("utf-16-be", Encoding.UTF_16_BE),
+            ("cp1252", Encoding.CP1252),
+            ("iso-8859-1", Encoding.ISO_8859_1),
+        ],
+    )
+    @pytest.mark.parametrize("mapped", [False, True])
+    def test_encoding(
+        self,
+        tmp_path: Path,
+        monkeypatch,
+        encoding: str,
+        expected: Encoding,
+        mapped: bool,
+    ):
+        if mapped:
+            monkeypatch.setattr(Subtitle, "mmap_threshold", 0)
+        text = "1\r\n00:00:01,000 --> 00:00:02,000\r\nÜbersetzung “Schön”\r\n\r\n"
+        if encoding == "iso-8859-1":
+            text = text.replace("“", "\x81").replace("”", "\x81")
+        path = tmp_path / "sub.srt"
+        path.write_bytes(text.encode(encoding))
+        subtitle = SubtitleParser.load(path)
+        assert subtitle.encoding == expected
+        assert len(subtitle.sections) == 1
+        assert subtitle.sections[0].lines == [text.splitlines()[2]]
+
+    def test_stream(self, subtitle: SrtSubtitle):
+        streamed = SubtitleParser.load(Path("tests/resources/sub.srt"), stream=True)
+        assert streamed.sections == []
+        assert streamed.encoding == subtitle.encoding
+        sections = list(streamed.stream())
+        assert len(sections) == len(subtitle.sections)
+        for a, b in zip(sections, subtitle.sections):
+            assert str(a) == str(b)
+
+    def test_stream_utf16_head(self, tmp_path: Path):
+        # an emoji is a surrogate pair in UTF-16, cut in half by the head
+        # the encoding is detected from
+        timing = "1\n00:00:01,000 --> 00:00:02,000\n"
+        text = timing + "a" * (511 - len(timing)) + "😀\n"
+        path = tmp_path / "sub.srt"
+        path.write_bytes(text.encode("utf-16-le"))
+        assert path.read_bytes()[1022:1026] == "😀".encode("utf-16-le")
+        streamed = SubtitleParser.load(path, stream=True)
+        assert streamed.encoding == Encoding.UTF_16_LE
+        assert next(streamed.stream()).lines == [text.splitlines()[2]]
+
+    @pytest.mark.parametrize("newline", ["\n", "\r\n", "\r"])
+    def test_read_mapped(self, tmp_path: Path, subtitle: SrtSubtitle, newline: str):
+        path = tmp_path / "sub.srt"
+        text = Path("tests/resources/sub.srt").read_text(encoding="utf-8-sig")
+        text = text.replace("\n", newline) + "x" * 100
+        path.write_bytes(codecs.BOM_UTF8 + text.encode("utf-8"))
+        mapped = SrtSubtitle(path, stream=True)
+        # blocks shorter than some of the lines
+        lines = list(mapped.read_mapped(block_size=64))
+        assert lines == list(mapped.read_file())
+        assert lines[0] == "1"
+        assert lines[-2:] == ["x" * 100, ""]
+
+    def test_vtt(self, tmp_path: Path):
+        subtitle = SubtitleParser.load(Path("tests/resources/sub.vtt"))
+        assert isinstance(subtitle, VttSubtitle)
+        assert len(subtitle.sections) == 4
+        assert subtitle.sections[0].lines == ["[DOOR OPENS]", "JOHN: Hello there."]
+        assert str(subtitle.sections[0].timing) == (
+            "00:00:01.000 --> 00:00:03.500 align:start line:0"
+        )
+        assert subtitle.header[0] == "WEBVTT\nKind: captions\nLanguage: en"
+        assert subtitle.header[-1] == "NOTE produced by a fansub group"
+        path = subtitle.save(tmp_path / "out.vtt")
+        saved = SubtitleParser.load(path)
+        assert saved.header == subtitle.header
+        assert [str(s) for s in saved.sections] == [str(s) for s in subtitle.sections]
+        assert "1\n00:00:01.000" in path.read_text()
+        assert "\nintro\n00:00:06.500" in path.read_text()
+        # header blocks keep their indentation
+        assert "\nSTYLE\n::cue {\n  color: yellow;\n}\n\n" in path.read_text()
+        # notes between cues stay in place, also when the cue following them
+        # is removed
+        assert (
+            "- Fine.\n\nNOTE this comment is kept\n\n00:00:09.000" in path.read_text()
+        )
+        subtitle.sections.pop(3)
+        assert subtitle.dumps().endswith("- Fine.\n\nNOTE this comment is kept\n\n")
+
+    def test_ass(self, tmp_path: Path):
+        subtitle = SubtitleParser.load(Path("tests/resources/sub.ass"))
+        assert isinstance(subtitle, AssSubtitle)
+        assert len(subtitle.sections) == 3
+        assert subtitle.sections[0].lines == ["[DOOR OPENS]", "JOHN: Hello, there."]
+        assert subtitle.sections[0].timing.start == 1000
+        assert subtitle.sections[2].timing.end_time == "0:00:08.00"
+        subtitle.sections[0].lines.pop(0)
+        subtitle.sections[0].timing.end = 3456
+        text = subtitle.dumps()
+        assert (
+            "Dialogue: 0,0:00:01.00,0:00:03.46,Default,John,0,0,0,,JOHN: Hello, there.\n"
+            in text
+        )
+        assert text.startswith("[Script Info]\n")
+        assert text.endswith("- Fine.\n\n[Fonts]\n")
+        original = Path("tests/resources/sub.ass").read_text()
+        assert text.count("\n") == original.count("\n")
+        # Comment events stay where they were, also when the event following
+        # them is removed
+        assert SubtitleParser.load(Path("tests/resources/sub.ass")).dumps() == original
+        subtitle.sections.pop(0)
+        lines = subtitle.dumps().splitlines()
+        assert lines[lines.index("[Events]") + 2].endswith(",timing checked")
+        assert lines[lines.index("[Events]") + 3].endswith(",Subtitles by SubGroup")
+
+    def test_stream_header(self, tmp_path: Path):
+        for name in ("sub.vtt", "sub.ass"):
+            subtitle = SubtitleParser.load(Path("tests/resources", name))
+            streamed = SubtitleParser.load(Path("tests/resources", name), stream=True)
+            path = streamed.write(streamed.stream(), tmp_path / name)
+            assert path.read_text() == subtitle.dumps()
+
+    def test_detect(self, tmp_path: Path):
+        # WebVTT saved with the extension of SubRip
+        path = tmp_path / "sub.srt"
+        path.write_bytes(Path("tests/resources/sub.vtt").read_bytes())
+        assert isinstance(SubtitleParser.load(path), VttSubtitle)
+        text = "1\n00:00:01,000 --> 00:00:02,000\nHello\n"
+        path = tmp_path / "sub.txt"
+        path.write_text(text, encoding="utf-16")
+        assert isinstance(SubtitleParser.load(path), SrtSubtitle)
+        # a surrogate pair across the end of the head the format is sniffed from
+        text = "1\n00:00:01,000 --> 00:00:02,000\n" + "a" * 2015 + "😀\n"
+        path.write_bytes(text.encode("utf-16-le"))
+        assert path.read_bytes()[4094:4098] == "😀".encode("utf-16-le")
+        assert SubtitleParser.load(path).sections[0].lines == [text.splitlines()[2]]
+        assert SubtitleFormat.detect(Path("sub.ssa"), "") is SubtitleFormat.SSA
+        with pytest.raises(NotImplementedError):
+            SubtitleFormat.detect(Path("sub.txt"), b"Hello")
+
+    def test_save_encoding(self, tmp_path: Path):
+        path = tmp_path / "sub.srt"
+        path.write_bytes("1\n00:00:01,000 --> 00:00:02,000\nSchön\n".encode("cp1252"))
+        subtitle = SubtitleParser.load(path)
+        assert subtitle.save(tmp_path / "a.srt").read_bytes().decode() == (
+            "1\n00:00:01,000 --> 00:00:02,000\nSchön\n\n"
+        )
+        kept = subtitle.save(tmp_path / "b.srt", keep_encoding=True)
+        assert kept.read_bytes() == subtitle.dumps().encode("cp1252")
+        streamed = SubtitleParser.load(path, stream=True)
+        kept = streamed.write(streamed.stream(), tmp_path / "c.srt", True)
+        assert kept.read_bytes() == subtitle.dumps().encode("cp1252")
+        # a UTF-8 byte order mark is kept, once also when written in chunks
+        text = subtitle.dumps() * 1100
+        path.write_bytes(codecs.BOM_UTF8 + text.encode("utf-8"))
+        for stream in (False, True):
+            bom = SubtitleParser.load(path, stream=stream)
+            assert bom.encoding == Encoding.UTF_8_SIG
+            kept = bom.write(bom.stream() if stream else bom.sections, path, True)
+            assert kept.read_bytes().count(codecs.BOM_UTF8) == 1
+            kept = bom.save(tmp_path / "e.srt")
+            assert not kept.read_bytes().startswith(codecs.BOM_UTF8)
+        # not representable in the input encoding
+        subtitle.sections[0].lines = [Line("♪ Schön ♪")]
+        saved = subtitle.save(tmp_path / "d.srt", keep_encoding=True)
+        assert saved.read_text(encoding="utf-8").endswith("♪ Schön ♪\n\n")
+
+    def test_write_encoding(self, tmp_path: Path):
+        path = tmp_path / "sub.srt"
+        text = "".join(
+            f"{i}\n00:{i // 60:02d}:{i % 60:02d},000 --> 00:{i // 60:02d}:"
+            f"{i % 60:02d},500\nSchön\n\n"
+            for i in range(1, 2000)
+        )
+        path.write_bytes(text.encode("cp1252"))
+
+        def music(sections):
+            for section in sections:
+                if section.timing.start == 1500000:
+                    section.lines = [Line("♪ Schön ♪")]
+                yield section
+
+        # the chunks written before the one not representable in cp1252 are
+        # re-encoded as UTF-8
+        streamed = SubtitleParser.load(path, stream=True)
+        saved = streamed.write(music(streamed.stream()), tmp_path / "out.srt", True)
+        subtitle = SubtitleParser.load(path)
+        subtitle.sections[1499].lines = [Line("♪ Schön ♪")]
+        assert saved.read_bytes() == subtitle.dumps().encode("utf-8")
+
+    def test_save_atomic(self, subtitle: SrtSubtitle, tmp_path: Path, monkeypatch):
+        path = tmp_path / "sub.srt"
+        path.write_text("original", encoding="utf-8")
+
+        def render(sections):
+            yield "1\n"
+            raise RuntimeError("crash")
+
+        monkeypatch.setattr(subtitle, "render", render)
+        with pytest.raises(RuntimeError):
+            subtitle.save(path)
+        with pytest.raises(RuntimeError):
+            subtitle.write(subtitle.sections, path)
+        assert path.read_text(encoding="utf-8") == "original"
+        assert list(tmp_path.iterdir()) == [path]
+
+    def test_save_permissions(self, subtitle: SrtSubtitle, tmp_path: Path):
+        path = tmp_path / "sub.srt"
+        path.write_text("original", encoding="utf-8")
+        path.chmod(0o640)
+        if os.geteuid() == 0:
+            os.chown(path, 1234, 1234)
+        subtitle.save(path)
+        assert path.stat().st_mode & 0o7777 == 0o640
+        if os.geteuid() == 0:
+            assert (path.stat().st_uid, path.stat().st_gid) == (1234, 1234)
+
+    def test_dump_chunks(self, subtitle: SrtSubtitle):
+        out_f = io.StringIO()
+        subtitle.dump(subtitle.sections, out_f, chunk_size=7)
+        assert out_f.getvalue() == subtitle.dumps()
+        assert subtitle.dumps().startswith("1\n00:00:06,605 --> 00:00:08,845\n")
@@ -0,0 +1,70 @@
+from pathlib import Path
+
+import pytest
+
+from subclean.core.parser import SubtitleParser
+from subclean.core.section import SrtSection
+from subclean.core.section.timing import SrtSectionTiming
+from subclean.core.timeline import Timeline, retime
+from subclean.subclean import main
+
+
+class TestTimeline:
+    @pytest.fixture()
+    def sections(self) -> list[SrtSection]:
+        return [
+            SrtSection(SrtSectionTiming(1000, 2000)),
+            SrtSection(SrtSectionTiming(1500, 3000)),
+            SrtSection(SrtSectionTiming(3000, 4000)),
+        ]
+
+    def test_parse_time(self):
+        assert SrtSectionTiming.parse_time("00:01:29,605") == 89605
+        assert SrtSectionTiming.parse_time("1:01:29.6") == 3689600
+        assert SrtSectionTiming.format_time(3689600) == "01:01:29,600"
+        assert SrtSectionTiming.parse_time("00:01:29:605") == 89605
+        assert SrtSectionTiming.parse_time("00:01:29,6054") == 89605
+        assert SrtSectionTiming.parse_time("00:01:29") == 89000
+        with pytest.raises(ValueError):
+            SrtSectionTiming.parse_time("01:29")
+
+    def test_shift(self, sections: list[SrtSection]):
+        timeline = Timeline.from_sections(sections)
+        timeline.shift(-1500)
+        timeline.apply(sections)
+        assert [(s.timing.start, s.timing.end) for s in sections] == [
+            (0, 500),
+            (0, 1500),
+            (1500, 2500),
+        ]
+
+    def test_convert_framerate(self, sections: list[SrtSection]):
+        timeline = Timeline.from_sections(sections)
+        timeline.convert_framerate(25, 23.976)
+        assert list(timeline.starts) == [1043, 1564, 3128]
+
+    def test_overlaps(self, sections: list[SrtSection]):
+        assert Timeline.from_sections(sections).overlaps() == [0]
+
+    def test_retime_chunks(self, sections: list[SrtSection]):
+        retimed = list(retime(sections, shift=100, chunk_size=2))
+        assert [s.timing.start for s in retimed] == [1100, 1600, 3100]
+
+    def test_cli(self, tmp_path: Path):
+        output_path = tmp_path / "out.srt"
+        main(
+            [
+                "tests/resources/sub.srt",
+                "-o",
+                str(output_path),
+                "--processors",
+                "Style",
+                "--shift",
+                "1000",
+            ]
+        )
+        original = SubtitleParser.load(Path("tests/resources/sub.srt"))
+        shifted = SubtitleParser.load(output_path)
+        assert [s.timing.start for s in shifted.sections] == [
+            s.timing.start + 1000 for s in original.sections
+        ]
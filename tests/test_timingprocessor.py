@@ -0,0 +1,80 @@
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from subclean.core.line import Line
+from subclean.core.parser import SubtitleParser
+from subclean.core.section import Section, SrtSection
+from subclean.core.section.timing import SrtSectionTiming
+from subclean.core.timeline import Timeline
+from subclean.processors.pipeline import Pipeline
+from subclean.processors.processor import DEFAULT_PROCESSORS, TimingProcessor
+
+
+def section(start: int, end: int, *lines: str) -> Section:
+    return SrtSection(SrtSectionTiming(start, end), [Line(line) for line in lines])
+
+
+class TestTimingProcessor:
+    @pytest.fixture()
+    def processor(self) -> TimingProcessor:
+        subtitle = MagicMock()
+        return TimingProcessor(subtitle)
+
+    def timings(self, sections: list[Section]) -> list[tuple[int, int]]:
+        return [(s.timing.start, s.timing.end) for s in sections]
+
+    def test_merge_duplicates(self, processor: TimingProcessor):
+        sections = list(
+            processor.process_stream(
+                [
+                    section(0, 1000, "Hello"),
+                    section(1000, 2000, "Hello"),
+                    section(2050, 3000, "Hello"),
+                    section(4000, 5000, "Hello"),
+                ]
+            )
+        )
+        assert self.timings(sections) == [(0, 3000), (4000, 5000)]
+        assert processor.stats.rules["merge_duplicate"] == 2
+
+    def test_min_duration(self, processor: TimingProcessor):
+        sections = list(
+            processor.process_stream(
+                [section(0, 200, "a"), section(500, 600, "b"), section(5000, 5100, "c")]
+            )
+        )
+        # extended as far as the next section allows
+        assert self.timings(sections) == [(0, 420), (500, 1300), (5000, 5800)]
+
+    def test_fix_overlap(self, processor: TimingProcessor):
+        sections = list(
+            processor.process_stream(
+                [
+                    section(0, 3000, "a"),
+                    section(2000, 4000, "b"),
+                    section(2000, 5000, "c"),
+                ]
+            )
+        )
+        assert self.timings(sections) == [(0, 1920), (2000, 4000), (2000, 5000)]
+        assert processor.stats.rules["fix_overlap"] == 1
+
+    def test_drop_invalid(self, processor: TimingProcessor):
+        sections = list(processor.process_stream([section(1000, 1000, "a")]))
+        assert sections == []
+
+    def test_pipeline(self):
+        processors = [processor.value for processor in DEFAULT_PROCESSORS]
+        path = Path("tests/subs/Yellowjackets.S01E08.input.srt")
+        subtitle = Pipeline(
+            SubtitleParser.load(path), [*processors, TimingProcessor]
+        ).process()
+        timeline = Timeline.from_sections(subtitle.sections)
+        assert timeline.overlaps() == []
+        assert all(
+            s.timing.end - s.timing.start >= TimingProcessor.min_duration
+            or s.timing.end + TimingProcessor.min_gap >= n.timing.start
+            for s, n in zip(subtitle.sections, subtitle.sections[1:])
+        )